@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from travel_planner.pareto import non_dominated, pareto_prune
+
+def brute_force(points: np.ndarray) -> np.ndarray:
+    """Reference O(n^2) front: a row is kept unless another row dominates it."""
+    keep = np.ones(len(points), dtype=bool)
+    for i, p in enumerate(points):
+        for q in points:
+            if (q <= p).all() and (q < p).any():
+                keep[i] = False
+                break
+    return keep
+
+def datasets(k: int):
+    rng = np.random.default_rng(k)
+    yield rng.random((300, k))
+    # anti-correlated price vs rating: (almost) everything is on the front
+    x = rng.random(300)
+    yield np.column_stack([x, -x] + [rng.random(300) for _ in range(k - 2)])
+    # coarse values with many ties and exact duplicates
+    yield rng.integers(0, 4, (300, k)).astype(float)
+
+@pytest.mark.parametrize("k", [2, 3])
+def test_non_dominated_matches_brute_force(k):
+    for points in datasets(k):
+        assert (non_dominated(points, chunk=16) == brute_force(points)).all()
+
+def test_non_dominated_empty():
+    assert non_dominated(np.zeros((0, 2))).shape == (0,)
+
+def test_pareto_prune_keeps_cheapest_and_order():
+    restaurants = [{"name": str(i), "avg_price": 10.0 + i, "rating": 4.0 + i / 10} for i in range(20)]
+    kept = pareto_prune("restaurant", restaurants, cap=5)
+    assert len(kept) == 5
+    assert kept[0]["name"] == "0"
+    assert [r["name"] for r in kept] == sorted((r["name"] for r in kept), key=int)
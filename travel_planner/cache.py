@@ -0,0 +1,254 @@
+import copy
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from travel_planner.config import settings
+
+MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe in-process key/value cache with per-entry expiry.
+    Values are deep-copied on the way in and out so callers can mutate what they get back.
+    """
+    def __init__(self, default_ttl: float | None = None, max_entries: int = 10000):
+        self.default_ttl = default_ttl if default_ttl is not None else settings.CACHE_TTL_SECONDS
+        self.max_entries = max_entries
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return default
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: float | None = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        value = copy.deepcopy(value)
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                self._evict()
+            self._data[key] = (time.time() + ttl, value)
+
+    def ttl(self, key: str) -> float | None:
+        """Seconds until `key` expires, or None if it is not cached."""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return None
+        remaining = entry[0] - time.time()
+        return remaining if remaining > 0 else None
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self):
+        # drop expired entries first, then the ones closest to expiry
+        now = time.time()
+        expired = [k for k, (exp, _) in self._data.items() if exp <= now]
+        for k in expired:
+            del self._data[k]
+        if len(self._data) >= self.max_entries:
+            for k, _ in sorted(self._data.items(), key=lambda kv: kv[1][0])[:max(1, self.max_entries // 10)]:
+                del self._data[k]
+
+class SQLiteCache:
+    """
+    Cross-process cache backed by a SQLite file in WAL mode, so every worker process on a host shares
+    the same entries. Same get/set/ttl/delete/clear interface as TTLCache; values are stored as JSON.
+    Each thread (and each forked process) opens its own connection; concurrent writers are serialized
+    by SQLite with a busy timeout.
+    """
+    def __init__(self, path: str, default_ttl: float | None = None, busy_timeout: float = 30.0, purge_every: int = 500):
+        self.path = path
+        self.default_ttl = default_ttl if default_ttl is not None else settings.CACHE_TTL_SECONDS
+        self.busy_timeout = busy_timeout
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float | None = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        payload = json.dumps(value, default=str)
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, payload, time.time() + ttl))
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def ttl(self, key: str) -> float | None:
+        row = self._conn().execute("SELECT expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        remaining = row[0] - time.time()
+        return remaining if remaining > 0 else None
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+_cache = None
+_cache_lock = threading.Lock()
+_observers: List[Callable[[Callable[..., Any], Dict[str, Any]], None]] = []
+_inflight: Dict[str, "_Flight"] = {}
+_inflight_lock = threading.Lock()
+
+class _Flight:
+    """One in-progress computation of a cache key, shared by every concurrent caller of that key."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+def _single_flight(key: str, compute: Callable[[], Any]) -> Any:
+    """
+    Run compute() for `key` unless the same key is already being computed, in which case wait for that
+    call and share its result (deep-copied), so concurrent identical calls send one upstream request.
+    """
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result)
+    try:
+        result = compute()
+        flight.result = copy.deepcopy(result)
+        return result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+
+def get_cache():
+    """Process-wide cache backend, built from settings (CACHE_BACKEND, CACHE_PATH) on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if settings.CACHE_BACKEND == "sqlite":
+                    _cache = SQLiteCache(settings.CACHE_PATH)
+                else:
+                    _cache = TTLCache()
+    return _cache
+
+def set_cache(backend):
+    """Replace the process-wide cache backend (anything with get/set/ttl/delete/clear)."""
+    global _cache
+    _cache = backend
+
+def add_observer(callback: Callable[[Callable[..., Any], Dict[str, Any]], None]):
+    """Register callback(fn, kwargs), invoked on every call of a @cached function."""
+    if callback not in _observers:
+        _observers.append(callback)
+
+def remove_observer(callback: Callable[[Callable[..., Any], Dict[str, Any]], None]):
+    if callback in _observers:
+        _observers.remove(callback)
+
+def make_key(namespace: str, kwargs: Dict[str, Any]) -> str:
+    payload = json.dumps(kwargs, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{namespace}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+def cached(namespace: str, ttl: float | None = None, ignore: Tuple[str, ...] = ("verbose",), cache_if: Optional[Callable[[Any], bool]] = None):
+    """
+    Cache a function's results in the process-wide cache, keyed by its normalized arguments.
+    Arguments named in `ignore` are not part of the key; results for which `cache_if` returns False
+    (e.g. mock fallbacks after an upstream error) are returned but not stored. Concurrent calls with the
+    same key share one computation (also with the cache disabled) instead of each calling upstream.
+
+    The wrapper also exposes:
+      - fn.refresh(*args, **kwargs): recompute and store, bypassing the cached value
+      - fn.cache_ttl(*args, **kwargs): seconds until the cached value expires (None if absent)
+    """
+    def decorator(fn):
+        sig = inspect.signature(fn)
+
+        def bind(args, kwargs) -> Dict[str, Any]:
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return dict(bound.arguments)
+
+        def key_for(call_kwargs: Dict[str, Any]) -> str:
+            return make_key(namespace, {k: v for k, v in call_kwargs.items() if k not in ignore})
+
+        def compute(call_kwargs: Dict[str, Any], key: str):
+            result = fn(**call_kwargs)
+            if cache_if is None or cache_if(result):
+                get_cache().set(key, result, ttl)
+            return result
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            call_kwargs = bind(args, kwargs)
+            for observer in list(_observers):
+                try:
+                    observer(wrapper, call_kwargs)
+                except Exception:
+                    pass
+            key = key_for(call_kwargs)
+            if not settings.CACHE_ENABLED:
+                return _single_flight(key, lambda: fn(**call_kwargs))
+            hit = get_cache().get(key, MISSING)
+            if hit is not MISSING:
+                return hit
+            return _single_flight(key, lambda: compute(call_kwargs, key))
+
+        def refresh(*args, **kwargs):
+            call_kwargs = bind(args, kwargs)
+            return compute(call_kwargs, key_for(call_kwargs))
+
+        def cache_ttl(*args, **kwargs):
+            return get_cache().ttl(key_for(bind(args, kwargs)))
+
+        wrapper.refresh = refresh
+        wrapper.cache_ttl = cache_ttl
+        wrapper.namespace = namespace
+        return wrapper
+    return decorator
@@ -11,6 +11,43 @@ class Settings(BaseSettings):
 
     USER_AGENT: str = "TravelPlannerBot/1.0"
     DEFAULT_PASSENGERS: int = 1
+
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_SECONDS: int = 600
+    CACHE_BACKEND: str = "memory"  # "memory" (per process) or "sqlite" (shared by all processes on the host)
+    CACHE_PATH: str = "cache/travel_planner.sqlite"
+
+    # Upstream rate limits (requests/second) and optional monthly quotas
+    AMADEUS_RATE_LIMIT: float = 10.0
+    AMADEUS_MONTHLY_QUOTA: int | None = None
+    SERPAPI_RATE_LIMIT: float = 1.0
+    SERPAPI_MONTHLY_QUOTA: int | None = None
+    RATE_LIMIT_MODE: str = "wait"  # "wait" or "fail"
+    RATE_LIMIT_MAX_WAIT: float = 10.0
+
+    # Opt-in micro-batching of concurrent LLM ranking requests
+    LLM_BATCH_ENABLED: bool = False
+    LLM_BATCH_WINDOW_MS: float = 15.0
+    LLM_BATCH_MAX_SIZE: int = 8
+
+    # Upstream record/replay: "off", "record" or "replay"
+    SNAPSHOT_MODE: str = "off"
+    SNAPSHOT_PATH: str = "snapshots/upstream.snap"
+    SNAPSHOT_LATENCY_MS: float = 0.0
+
+    # Plan checkpoints kept for replan()/summarize(): LRU-bounded, expire after inactivity
+    CHECKPOINT_MAX_PLANS: int = 1000
+    CHECKPOINT_TTL_SECONDS: int = 3600
+
+    # Distilled local ranker: JSONL log of LLM rankings, trained model, and the confidence needed to skip the LLM
+    RANKING_LOG_PATH: str | None = None
+    LOCAL_RANKER_PATH: str | None = None
+    LOCAL_RANKER_THRESHOLD: float = 0.8
+
+    # Launch relaxation queries in the first fan-out when route price history predicts a tight budget;
+    # a query is speculated when its expected pre-relaxation cost exceeds THRESHOLD x budget
+    SPECULATIVE_RELAXATION: bool = True
+    SPECULATION_THRESHOLD: float = 1.0
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,82 @@
+from typing import Dict, Any, List, Optional
+from travel_planner.utils import restaurant_price
+
+def _money(value: Any) -> str:
+    return f"${float(value or 0):,.2f}"
+
+def _when(value: Optional[str]) -> str:
+    return value.replace("T", " ") if isinstance(value, str) else "n/a"
+
+def _flight_line(flight: Optional[Dict[str, Any]]) -> str:
+    if not flight:
+        return "Flight: none selected"
+    stops = flight.get("stops")
+    stops_text = "direct" if stops == 0 else (f"{stops} stop{'s' if stops != 1 else ''}" if stops is not None else "stops n/a")
+    return (f"Flight: {flight.get('airline', 'Unknown airline')} - {_money(flight.get('price'))}, {stops_text}, "
+            f"departs {_when(flight.get('departure'))}, arrives {_when(flight.get('arrival'))}")
+
+def _hotel_line(hotel: Optional[Dict[str, Any]], nights: int) -> str:
+    if not hotel:
+        return "Hotel: none selected"
+    details = []
+    if hotel.get("stars"):
+        details.append(f"{hotel['stars']} stars")
+    if hotel.get("rating"):
+        details.append(f"rating {hotel['rating']}")
+    per_night = float(hotel.get("price_per_night", 0) or 0)
+    return (f"Hotel: {hotel.get('name', 'Unknown hotel')}{' (' + ', '.join(details) + ')' if details else ''} - "
+            f"{_money(per_night)}/night x {nights} night{'s' if nights != 1 else ''} = {_money(per_night * nights)}")
+
+def _restaurant_lines(restaurants: List[Dict[str, Any]]) -> List[str]:
+    if not restaurants:
+        return ["Restaurants: none selected"]
+    lines = ["Restaurants:"]
+    for r in restaurants:
+        details = [d for d in (r.get("cuisine"), r.get("neighborhood")) if d]
+        if r.get("rating"):
+            details.append(f"rating {r['rating']}")
+        lines.append(f"  - {r.get('name', 'Unknown restaurant')}{' (' + ', '.join(details) + ')' if details else ''} - ~{_money(restaurant_price(r))}")
+    return lines
+
+def _cost_lines(costs: Dict[str, Any]) -> List[str]:
+    budget = costs.get("budget", 0)
+    subtotal = costs.get("subtotal", 0)
+    lines = [f"Costs: flight {_money(costs.get('flight'))} + hotel {_money(costs.get('hotel'))} + "
+             f"restaurants {_money(costs.get('restaurant'))} = {_money(subtotal)}"]
+    difference = round(float(budget or 0) - float(subtotal or 0), 2)
+    if difference >= 0:
+        lines.append(f"Under budget by {_money(difference)}")
+    else:
+        lines.append(f"Over budget by {_money(-difference)}")
+    return lines
+
+def render_itinerary(plan: Dict[str, Any]) -> str:
+    """
+    Fast, deterministic itinerary text built from the structured plan (no LLM call).
+    The rich LLM narrative is requested separately via TravelPlannerOrchestrator.summarize().
+    """
+    costs = plan.get("costs", {})
+    nights = plan.get("nights", 0)
+    budget = costs.get("budget", 0)
+    lines = [f"Trip: {nights} night{'s' if nights != 1 else ''}, budget {_money(budget)}", ""]
+    lines.append(_flight_line(plan.get("chosen_flight")))
+    lines.append(_hotel_line(plan.get("chosen_hotel"), nights))
+    lines.extend(_restaurant_lines(plan.get("chosen_restaurants") or []))
+    lines.append("")
+    lines.extend(_cost_lines(costs))
+    return "\n".join(lines)
+
+def render_multi_city_itinerary(trip: Dict[str, Any]) -> str:
+    """Template itinerary for a multi-city trip from TravelPlannerOrchestrator.plan_multi_city()."""
+    costs = trip.get("costs", {})
+    lines = [f"Trip: {' -> '.join(trip.get('cities', []))}, {trip.get('nights', 0)} nights, budget {_money(costs.get('budget'))}"]
+    for n, leg in enumerate(trip.get("legs", []), 1):
+        lines.append("")
+        lines.append(f"Leg {n}: {leg.get('from')} -> {leg.get('to')} on {leg.get('depart_date')} ({_money(leg.get('costs', {}).get('subtotal'))})")
+        lines.append(_flight_line(leg.get("chosen_flight")))
+        if leg.get("nights"):
+            lines.append(_hotel_line(leg.get("chosen_hotel"), leg["nights"]))
+            lines.extend(_restaurant_lines(leg.get("chosen_restaurants") or []))
+    lines.append("")
+    lines.extend(_cost_lines(costs))
+    return "\n".join(lines)
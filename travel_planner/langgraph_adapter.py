@@ -1,5 +1,11 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional, Tuple
+from travel_planner.config import settings
 try:
     import langgraph  # optional real LangGraph
     LANGGRAPH_AVAILABLE = True
@@ -34,3 +40,118 @@ class LangGraphAdapter:
                 except Exception as e:
                     results[node_name] = {"error": str(e)}
         return results
+
+    def run_tasks_parallel(self, tasks: Dict[str, Tuple[str, Dict[str, Any]]], max_workers: int = 8) -> Dict[str, Any]:
+        """
+        Execute many (node_name, kwargs) tasks at once, e.g. every leg of a multi-city trip, and return
+        results mapping task_id -> result. Tasks with the same node and arguments run once and share the result.
+        """
+        results = {}
+        unique: Dict[Tuple[str, str], list] = {}
+        for task_id, (node_name, kwargs) in tasks.items():
+            if node_name not in self.nodes:
+                results[task_id] = {"error": "node not registered"}
+                continue
+            key = (node_name, json.dumps(kwargs, sort_keys=True, default=str))
+            unique.setdefault(key, []).append(task_id)
+        if not unique:
+            return results
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as ex:
+            futures = {}
+            for key, task_ids in unique.items():
+                node_name, kwargs = tasks[task_ids[0]]
+                futures[ex.submit(self.nodes[node_name], **kwargs)] = task_ids
+            for future, task_ids in futures.items():
+                try:
+                    result = future.result(timeout=30)
+                except Exception as e:
+                    result = {"error": str(e)}
+                for task_id in task_ids:
+                    results[task_id] = result
+        return results
+
+class CheckpointStore:
+    """
+    Stores the latest intermediate state of each plan under its plan_id.
+    Uses LangGraph's in-memory checkpointer when LangGraph is installed, otherwise a plain dict.
+    Only the latest checkpoint per plan is kept, plans unused for CHECKPOINT_TTL_SECONDS expire, and at most
+    CHECKPOINT_MAX_PLANS plans are kept (least recently used evicted first).
+    """
+    def __init__(self, max_plans: int | None = None, ttl: float | None = None):
+        self.max_plans = max_plans if max_plans is not None else settings.CHECKPOINT_MAX_PLANS
+        self.ttl = ttl if ttl is not None else settings.CHECKPOINT_TTL_SECONDS
+        self._saver = None
+        self._versions: Dict[str, Any] = {}
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        if LANGGRAPH_AVAILABLE:
+            try:
+                from langgraph.checkpoint.memory import InMemorySaver
+                self._saver = InMemorySaver()
+            except Exception:
+                self._saver = None
+
+    @property
+    def backend(self) -> str:
+        return "langgraph" if self._saver is not None else "memory"
+
+    @staticmethod
+    def _config(plan_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": plan_id, "checkpoint_ns": ""}}
+
+    def _drop(self, plan_id: str):
+        # caller holds the lock
+        self._last_used.pop(plan_id, None)
+        self._states.pop(plan_id, None)
+        self._versions.pop(plan_id, None)
+        if self._saver is not None:
+            self._saver.delete_thread(plan_id)
+
+    def _evict(self):
+        # caller holds the lock; _last_used is ordered from least to most recently used
+        now = time.monotonic()
+        while self._last_used:
+            plan_id, last_used = next(iter(self._last_used.items()))
+            if len(self._last_used) <= self.max_plans and now - last_used < self.ttl:
+                break
+            self._drop(plan_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._last_used)
+
+    def put(self, plan_id: str, state: Dict[str, Any]):
+        with self._lock:
+            self._last_used[plan_id] = time.monotonic()
+            self._last_used.move_to_end(plan_id)
+            if self._saver is None:
+                self._states[plan_id] = copy.deepcopy(state)
+            else:
+                from langgraph.checkpoint.base import empty_checkpoint
+                version = self._saver.get_next_version(self._versions.get(plan_id), None)
+                # keep only the latest checkpoint of each plan
+                self._saver.delete_thread(plan_id)
+                checkpoint = empty_checkpoint()
+                checkpoint["channel_values"] = {"state": copy.deepcopy(state)}
+                checkpoint["channel_versions"] = {"state": version}
+                self._saver.put(self._config(plan_id), checkpoint, {"source": "update", "step": -1}, {"state": version})
+                self._versions[plan_id] = version
+            self._evict()
+
+    def get(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            last_used = self._last_used.get(plan_id)
+            if last_used is None:
+                return None
+            if time.monotonic() - last_used >= self.ttl:
+                self._drop(plan_id)
+                return None
+            self._last_used[plan_id] = time.monotonic()
+            self._last_used.move_to_end(plan_id)
+            if self._saver is None:
+                state = self._states.get(plan_id)
+            else:
+                checkpoint_tuple = self._saver.get_tuple(self._config(plan_id))
+                state = checkpoint_tuple.checkpoint["channel_values"].get("state") if checkpoint_tuple else None
+            return copy.deepcopy(state) if state is not None else None
@@ -0,0 +1,231 @@
+"""
+Distilled local ranker: a per-role linear model trained (pure NumPy, CPU) on logged LLM rankings.
+
+Logging: set RANKING_LOG_PATH and every successful LLM ranking is appended as one JSON line
+({role, context, candidates, ranking: [[candidate index, score], ...]}).
+
+Training / evaluation:
+    python -m travel_planner.llm.local_ranker train --log rankings.jsonl --out ranker.npz
+    python -m travel_planner.llm.local_ranker evaluate --log rankings.jsonl --model ranker.npz
+
+Serving: set LOCAL_RANKER_PATH; rank_items_via_llm() uses the local model whenever its confidence
+is at least LOCAL_RANKER_THRESHOLD and only sends ambiguous cases to the LLM.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from travel_planner.config import settings
+from travel_planner.utils import PRICE_FIELDS, item_price
+
+FEATURES = ["price_vs_budget", "price_vs_min", "is_cheapest", "rating", "stars", "stops", "cuisine_match"]
+
+_log_lock = threading.Lock()
+
+def log_ranking(role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any], ranked: List[Dict[str, Any]]):
+    """Append one LLM ranking to RANKING_LOG_PATH (no-op when unset)."""
+    path = settings.RANKING_LOG_PATH
+    if not path:
+        return
+    strip = lambda d: {k: v for k, v in d.items() if k != "score"}
+    plain = [strip(c) for c in candidates]
+    ranking = []
+    for r in ranked:
+        try:
+            ranking.append([plain.index(strip(r)), r.get("score")])
+        except ValueError:
+            continue
+    record = {"ts": time.time(), "role": role, "context": context, "candidates": plain, "ranking": ranking}
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+def load_log(path: str) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+def features(role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any]) -> np.ndarray:
+    """Feature matrix (n candidates x len(FEATURES)), relative to the candidate set and the role budget."""
+    prices = np.array([item_price(c, *PRICE_FIELDS.get(role, ("price",))) for c in candidates], dtype=float)
+    budget = float(context.get("role_budget") or 0)
+    if role == "hotel":
+        budget = budget / max(int(context.get("nights") or 1), 1) if budget else 0.0
+    scale = budget if budget > 0 else (np.median(prices) if prices.size and np.median(prices) > 0 else 1.0)
+    low, high = (prices.min(), prices.max()) if prices.size else (0.0, 0.0)
+    rating_scale = 10.0 if role == "hotel" else 5.0
+    cuisine = (context.get("cuisine") or "").lower()
+    rows = []
+    for c, p in zip(candidates, prices):
+        rows.append([
+            p / scale,
+            (p - low) / (high - low) if high > low else 0.0,
+            1.0 if p == low else 0.0,
+            float(c.get("rating") or 0) / rating_scale,
+            float(c.get("stars") or 0) / 5.0,
+            float(c.get("stops") or 0),
+            1.0 if cuisine and cuisine in str(c.get("cuisine", "")).lower() else 0.0
+        ])
+    return np.array(rows, dtype=float).reshape(len(candidates), len(FEATURES))
+
+def _preference_pairs(record: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """(better, worse) index pairs implied by a logged ranking: ranked order, and ranked over unranked."""
+    order = [idx for idx, _ in sorted(record["ranking"], key=lambda r: -float(r[1] or 0))]
+    unranked = [i for i in range(len(record["candidates"])) if i not in order]
+    pairs = [(order[i], order[j]) for i in range(len(order)) for j in range(i + 1, len(order))]
+    pairs += [(a, b) for a in order for b in unranked]
+    return pairs
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30, 30)))
+
+def train(records: List[Dict[str, Any]], l2: float = 1.0, iterations: int = 25) -> Dict[str, np.ndarray]:
+    """
+    Fit one pairwise logistic model per role (RankNet-style, Newton's method):
+    P(a preferred over b) = sigmoid(w . (x_a - x_b)).
+    """
+    diffs: Dict[str, List[np.ndarray]] = {}
+    for rec in records:
+        if not rec.get("ranking") or len(rec.get("candidates", [])) < 2:
+            continue
+        X = features(rec["role"], rec["candidates"], rec.get("context", {}))
+        for a, b in _preference_pairs(rec):
+            diffs.setdefault(rec["role"], []).append(X[a] - X[b])
+    weights = {}
+    for role, rows in diffs.items():
+        D = np.array(rows)
+        w = np.zeros(D.shape[1])
+        for _ in range(iterations):
+            p = _sigmoid(D @ w)
+            grad = D.T @ (p - 1.0) + l2 * w
+            hess = (D * (p * (1 - p))[:, None]).T @ D + l2 * np.eye(D.shape[1])
+            step = np.linalg.solve(hess, grad)
+            w -= step
+            if np.abs(step).max() < 1e-6:
+                break
+        weights[role] = w
+    return weights
+
+class LocalRanker:
+    def __init__(self, weights: Dict[str, np.ndarray]):
+        self.weights = weights
+
+    @classmethod
+    def load(cls, path: str) -> "LocalRanker":
+        data = np.load(path)
+        return cls({k: data[k] for k in data.files})
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, **self.weights)
+
+    def supports(self, role: str) -> bool:
+        return role in self.weights
+
+    def scores(self, role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any]) -> np.ndarray:
+        return features(role, candidates, context) @ self.weights[role]
+
+    def rank(self, role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any], top_k: int = 3) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        Returns (top_k candidates with a 1-100 'score', confidence). Confidence is the model's probability
+        for the two decisions that matter: the winner beats the runner-up, and the k-th pick beats the next one.
+        """
+        s = self.scores(role, candidates, context)
+        order = np.argsort(-s, kind="stable")
+        confidence = 1.0
+        if len(order) > 1:
+            confidence = float(_sigmoid(s[order[0]] - s[order[1]]))
+            if len(order) > top_k >= 1:
+                confidence = min(confidence, float(_sigmoid(s[order[top_k - 1]] - s[order[top_k]])))
+        display = 1 + 99 * _sigmoid(s - np.median(s))
+        ranked = []
+        for i in order[:top_k]:
+            c_copy = dict(candidates[i])
+            c_copy["score"] = round(float(display[i]), 2)
+            ranked.append(c_copy)
+        return ranked, confidence
+
+def evaluate(ranker: LocalRanker, records: List[Dict[str, Any]], threshold: float | None = None) -> Dict[str, Any]:
+    """Offline agreement with the logged LLM rankings (top-1 and pairwise), overall and above the threshold."""
+    threshold = settings.LOCAL_RANKER_THRESHOLD if threshold is None else threshold
+    total = top1 = confident = confident_top1 = 0
+    pairs = pairs_agree = 0
+    for rec in records:
+        role, cands = rec["role"], rec.get("candidates", [])
+        if not rec.get("ranking") or len(cands) < 2 or not ranker.supports(role):
+            continue
+        ctx = rec.get("context", {})
+        s = ranker.scores(role, cands, ctx)
+        llm_best = max(rec["ranking"], key=lambda r: float(r[1] or 0))[0]
+        _, conf = ranker.rank(role, cands, ctx, top_k=max(len(rec["ranking"]), 1))
+        hit = int(np.argmax(s)) == llm_best
+        total += 1
+        top1 += hit
+        if conf >= threshold:
+            confident += 1
+            confident_top1 += hit
+        for a, b in _preference_pairs(rec):
+            pairs += 1
+            pairs_agree += bool(s[a] > s[b])
+    return {
+        "records": total,
+        "top1_agreement": round(top1 / total, 4) if total else None,
+        "pairwise_agreement": round(pairs_agree / pairs, 4) if pairs else None,
+        "threshold": threshold,
+        "coverage": round(confident / total, 4) if total else None,
+        "confident_top1_agreement": round(confident_top1 / confident, 4) if confident else None
+    }
+
+_ranker: Optional[LocalRanker] = None
+_ranker_loaded = False
+
+def get_local_ranker() -> Optional[LocalRanker]:
+    """The serving model from LOCAL_RANKER_PATH (None if unset or missing)."""
+    global _ranker, _ranker_loaded
+    if not _ranker_loaded:
+        _ranker_loaded = True
+        path = settings.LOCAL_RANKER_PATH
+        if path and os.path.exists(path):
+            try:
+                _ranker = LocalRanker.load(path)
+            except Exception:
+                _ranker = None
+    return _ranker
+
+def set_local_ranker(ranker: Optional[LocalRanker]):
+    global _ranker, _ranker_loaded
+    _ranker, _ranker_loaded = ranker, True
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the distilled local ranker")
+    sub = parser.add_subparsers(dest="command", required=True)
+    t = sub.add_parser("train")
+    t.add_argument("--log", default=settings.RANKING_LOG_PATH)
+    t.add_argument("--out", default=settings.LOCAL_RANKER_PATH or "models/local_ranker.npz")
+    t.add_argument("--l2", type=float, default=1.0)
+    e = sub.add_parser("evaluate")
+    e.add_argument("--log", default=settings.RANKING_LOG_PATH)
+    e.add_argument("--model", default=settings.LOCAL_RANKER_PATH or "models/local_ranker.npz")
+    e.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args()
+
+    records = load_log(args.log)
+    if args.command == "train":
+        ranker = LocalRanker(train(records, l2=args.l2))
+        ranker.save(args.out)
+        print(f"Trained roles {sorted(ranker.weights)} on {len(records)} logged rankings -> {args.out}")
+        print(json.dumps(evaluate(ranker, records), indent=2))
+    else:
+        print(json.dumps(evaluate(LocalRanker.load(args.model), records, args.threshold), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,107 @@
 import os
 import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from openai import OpenAI
 from travel_planner.config import settings
+from travel_planner.cache import cached
+from travel_planner.tools import snapshot
+from travel_planner.llm.local_ranker import get_local_ranker, log_ranking
+from travel_planner.itinerary import render_itinerary
 
 openai_api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=openai_api_key) if openai_api_key else None
 
 MODEL = settings.OPENAI_MODEL or "gpt-4o-mini"
 
-def rank_items_via_llm(role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any], top_k: int = 3, verbose: bool = False) -> List[Dict[str, Any]]:
+def _llm_available() -> bool:
+    return client is not None or snapshot.replaying()
+
+def _chat(**request) -> str:
+    """One chat completion, recorded/replayed through the snapshot layer; returns the message text."""
+    return snapshot.upstream("openai.chat", request, lambda: client.chat.completions.create(**request).choices[0].message.content)
+
+# Fields the ranker actually needs per role; everything else (links, currency, ...) is left out of the prompt
+RANKING_FIELDS = {
+    "flight": ["airline", "price", "stops", "departure", "arrival"],
+    "hotel": ["name", "price_per_night", "stars", "rating"],
+    "restaurant": ["name", "cuisine", "avg_price", "rating"],
+}
+
+def _heuristic_rank(candidates: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    # heuristic: rank by price ascending (lower better) and rating / estimated_price
+    scored = []
+    for c in candidates:
+        price = float(c.get("price", c.get("price_per_night", c.get("estimated_price", 0)) or 0) or 0)
+        rating = float(c.get("rating", 0) or 0)
+        # simple score: normalized
+        score = max(1, 100 - price + rating)
+        c_copy = dict(c)
+        c_copy["score"] = round(score,2)
+        scored.append(c_copy)
+    scored_sorted = sorted(scored, key=lambda x: -x["score"])
+    return scored_sorted[:top_k]
+
+def _encode_candidates(role: str, candidates: List[Dict[str, Any]]) -> str:
     """
-    Ask OpenAI to rank candidate items for a role (flight/hotel/restaurant).
-    Returns top_k candidates with a 'score' field (1..100).
-    If OpenAI not configured, returns the input candidates with heuristic scoring.
+    Encode candidates as a compact table: a header row of field names followed by one
+    row per candidate, where the first column is the candidate's short integer ID.
     """
-    if verbose:
-        print(f"[LLM] Ranking {len(candidates)} {role} candidates...")
-    
-    if not client:
-        if verbose:
-            print(f"[LLM] No API key, using heuristic scoring")
-        # heuristic: rank by price ascending (lower better) and rating / estimated_price
-        scored = []
-        for c in candidates:
-            price = float(c.get("price", c.get("price_per_night", c.get("estimated_price", 0)) or 0) or 0)
-            rating = float(c.get("rating", 0) or 0)
-            # simple score: normalized
-            score = max(1, 100 - price + rating)
-            c_copy = dict(c)
-            c_copy["score"] = round(score,2)
-            scored.append(c_copy)
-        scored_sorted = sorted(scored, key=lambda x: -x["score"])
-        return scored_sorted[:top_k]
+    fields = RANKING_FIELDS.get(role) or sorted({k for c in candidates for k in c})
+    rows = [["id"] + fields]
+    for idx, c in enumerate(candidates):
+        row = [idx]
+        for f in fields:
+            value = c.get(f)
+            if f == "avg_price" and value is None:
+                value = c.get("estimated_price")
+            row.append(value)
+        rows.append(row)
+    return "\n".join(json.dumps(r, separators=(",", ":"), ensure_ascii=False) for r in rows)
+
+def _decode_ranking(text: str, candidates: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Map an `{"ranking": [[id, score], ...]}` response back onto the original candidate records.
+    Unknown or duplicate IDs are skipped; raises ValueError if nothing usable is returned.
+    """
+    parsed = _parse_json(text)
+    return _map_ranking(parsed.get("ranking") if isinstance(parsed, dict) else parsed, candidates, top_k)
+
+def _parse_json(text: str) -> Any:
+    text = text.strip()
+    # If the model returns text with backticks, remove them
+    if text.startswith("```"):
+        text = "\n".join(line for line in text.splitlines() if not line.startswith("```"))
+    return json.loads(text)
 
+def _map_ranking(pairs: Any, candidates: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    if not isinstance(pairs, list):
+        raise ValueError("ranking response is not a list")
+    ranked = []
+    seen = set()
+    for pair in pairs:
+        if not isinstance(pair, (list, tuple)) or len(pair) < 2:
+            continue
+        try:
+            idx = int(pair[0])
+            score = float(pair[1])
+        except (TypeError, ValueError):
+            continue
+        if idx in seen or not 0 <= idx < len(candidates):
+            continue
+        seen.add(idx)
+        c_copy = dict(candidates[idx])
+        c_copy["score"] = round(score, 2)
+        ranked.append(c_copy)
+    if not ranked:
+        raise ValueError("ranking response contained no valid candidate IDs")
+    ranked.sort(key=lambda x: -x["score"])
+    return ranked[:top_k]
+
+def _rank_once(role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any], top_k: int) -> List[Dict[str, Any]]:
     # Prepare a compact prompt
     prompt = f"""
 You are an assistant that ranks {role} options for a traveler.
@@ -43,71 +111,272 @@ Context:
 - dates: {context.get('start_date')} to {context.get('end_date')}
 - budget allocation for {role}: {context.get('role_budget')}
 
-Candidates (JSON list). For each candidate, return a numeric score 1-100 (higher is better),
-considering price, convenience, stops (for flights), rating (for hotels), estimated price (restaurants),
-and the user's cuisine preference: {context.get('cuisine')}.
+Score each candidate 1-100 (higher is better), considering price, convenience, stops (for flights),
+rating (for hotels), estimated price (restaurants), and the user's cuisine preference: {context.get('cuisine')}.
+
+Candidates, one JSON row each; the first row names the columns and "id" identifies the candidate:
+{_encode_candidates(role, candidates)}
+
+Return only a JSON object of the form {{"ranking": [[id, score], ...]}} with the top {top_k} candidates, best first.
+"""
+    text = _chat(
+        model=MODEL,
+        messages=[{"role":"system","content":"You rank travel options. Reply with JSON only."},
+                  {"role":"user","content":prompt}],
+        temperature=1.0,
+        response_format={"type": "json_object"},
+        max_tokens=32 + 12 * top_k
+    )
+    return _decode_ranking(text, candidates, top_k)
+
+@cached("ranking")
+def fetch_llm_ranking(role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any], top_k: int = 3) -> List[Dict[str, Any]]:
+    """
+    Single LLM ranking round-trip (no fallback). Raises if the client is missing or the reply is unusable,
+    so only successful rankings end up in the cache (and in the ranking log, when RANKING_LOG_PATH is set).
+    When batching is enabled the job is sent together with other concurrent rankings.
+    """
+    if not _llm_available():
+        raise RuntimeError("OpenAI client not configured")
+    batcher = _batcher
+    # replayed snapshots are keyed by single requests, so batching is bypassed in replay mode
+    if batcher is not None and not snapshot.replaying():
+        ranked = batcher.submit(role, candidates, context, top_k).result(timeout=batcher.timeout)
+    else:
+        ranked = _rank_once(role, candidates, context, top_k)
+    log_ranking(role, candidates, context, ranked)
+    return ranked
+
+class RankingBatcher:
+    """
+    Collects concurrent ranking jobs for up to `window_ms` (or until `max_batch` jobs are queued) and
+    sends them as one multi-task chat completion. Results are split back per job; a job whose part of
+    the response is missing or unusable fails on its own, and its caller falls back to heuristic scoring.
+    """
+    def __init__(self, window_ms: float = 15.0, max_batch: int = 8, timeout: float = 60.0, max_in_flight: int = 4):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm-batch")
+        self._counters = {"batches": 0, "jobs": 0, "failed_jobs": 0}
+        # guards the counters (updated from executor threads) and the stopped check in submit()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="llm-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any], top_k: int) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._stop.is_set():
+                future.set_exception(RuntimeError("ranking batcher stopped"))
+                return future
+            self._queue.put({"role": role, "candidates": candidates, "context": context, "top_k": top_k, "future": future})
+        return future
+
+    def _count(self, **increments):
+        with self._lock:
+            for k, v in increments.items():
+                self._counters[k] += v
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                jobs = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.window
+            while len(jobs) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    jobs.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, jobs)
+
+    def _dispatch(self, jobs: List[Dict[str, Any]]):
+        self._count(batches=1, jobs=len(jobs))
+        if len(jobs) == 1:
+            job = jobs[0]
+            try:
+                job["future"].set_result(_rank_once(job["role"], job["candidates"], job["context"], job["top_k"]))
+            except Exception as e:
+                self._count(failed_jobs=1)
+                job["future"].set_exception(e)
+            return
+        try:
+            results = _rank_batch(jobs)
+        except Exception as e:
+            self._count(failed_jobs=len(jobs))
+            for job in jobs:
+                job["future"].set_exception(e)
+            return
+        for idx, job in enumerate(jobs):
+            try:
+                job["future"].set_result(_map_ranking(results.get(str(idx)), job["candidates"], job["top_k"]))
+            except Exception as e:
+                self._count(failed_jobs=1)
+                job["future"].set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        batches = counters["batches"]
+        return {**counters, "queued": self._queue.qsize(),
+                "avg_batch_size": round(counters["jobs"] / batches, 2) if batches else 0.0}
+
+    def stop(self):
+        with self._lock:
+            self._stop.set()
+        self._thread.join()
+        # jobs queued after the loop's last pass are still dispatched, so no caller waits out its timeout
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(pending), self.max_batch):
+            self._executor.submit(self._dispatch, pending[start:start + self.max_batch])
+        self._executor.shutdown(wait=True)
 
-Return a JSON array of the top {top_k} candidates, each containing the original candidate fields plus a numeric "score".
+def _rank_batch(jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One chat completion ranking several independent tasks; returns {task id: [[id, score], ...]}."""
+    tasks = []
+    for idx, job in enumerate(jobs):
+        role, context = job["role"], job["context"]
+        tasks.append(f"""Task "{idx}": rank {role} options, return the top {job['top_k']}.
+- destination: {context.get('destination')}
+- dates: {context.get('start_date')} to {context.get('end_date')}
+- budget allocation for {role}: {context.get('role_budget')}
+- cuisine preference: {context.get('cuisine')}
 Candidates:
-{json.dumps(candidates[:20], indent=2)}
-Provide only the JSON array as output.
+{_encode_candidates(role, job['candidates'])}""")
+    prompt = f"""
+You are an assistant that ranks travel options for several independent tasks.
+
+For each task, score each candidate 1-100 (higher is better), considering price, convenience, stops (for flights),
+rating (for hotels), estimated price and cuisine preference (restaurants).
+Candidates are one JSON row each; the first row names the columns and "id" identifies the candidate.
+
+{chr(10).join(tasks)}
+
+Return only a JSON object of the form {{"results": {{"<task>": [[id, score], ...], ...}}}} covering every task, best first.
 """
+    text = _chat(
+        model=MODEL,
+        messages=[{"role":"system","content":"You rank travel options. Reply with JSON only."},
+                  {"role":"user","content":prompt}],
+        temperature=1.0,
+        response_format={"type": "json_object"},
+        max_tokens=sum(32 + 12 * job["top_k"] for job in jobs)
+    )
+    parsed = _parse_json(text)
+    results = parsed.get("results") if isinstance(parsed, dict) else None
+    if not isinstance(results, dict):
+        raise ValueError("batched ranking response has no results object")
+    return {str(k): v for k, v in results.items()}
+
+_batcher: Optional[RankingBatcher] = None
+_batcher_lock = threading.Lock()
+
+def enable_ranking_batching(window_ms: float | None = None, max_batch: int | None = None) -> RankingBatcher:
+    """Opt in to micro-batching of concurrent LLM ranking requests."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = RankingBatcher(window_ms=window_ms if window_ms is not None else settings.LLM_BATCH_WINDOW_MS,
+                                      max_batch=max_batch or settings.LLM_BATCH_MAX_SIZE)
+        return _batcher
+
+def disable_ranking_batching():
+    global _batcher
+    with _batcher_lock:
+        batcher, _batcher = _batcher, None
+    if batcher is not None:
+        batcher.stop()
+
+if settings.LLM_BATCH_ENABLED:
+    enable_ranking_batching()
+
+def rank_items_via_llm(role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any], top_k: int = 3, verbose: bool = False) -> List[Dict[str, Any]]:
+    """
+    Ask OpenAI to rank candidate items for a role (flight/hotel/restaurant).
+    Candidates are sent as a compact ID-keyed table and the model answers with [id, score] pairs,
+    which are mapped back to the original records.
+    Returns top_k candidates with a 'score' field (1..100).
+    When a distilled local ranker is loaded (LOCAL_RANKER_PATH), it answers every case it is confident
+    about and only ambiguous ones go to OpenAI; if that call fails, the local ranking is returned.
+    If OpenAI not configured, returns the local ranking or the input candidates with heuristic scoring.
+    """
+    if verbose:
+        print(f"[LLM] Ranking {len(candidates)} {role} candidates...")
+    
+    local = get_local_ranker()
+    local_ranked = None
+    if local is not None and local.supports(role) and candidates:
+        local_ranked, confidence = local.rank(role, candidates[:20], context, top_k)
+        if confidence >= settings.LOCAL_RANKER_THRESHOLD or not _llm_available():
+            if verbose:
+                print(f"[LLM] Local ranker used for {role} (confidence {confidence:.2f})")
+            return local_ranked
+        if verbose:
+            print(f"[LLM] Local ranker unsure for {role} (confidence {confidence:.2f}), asking the LLM")
+
+    if not _llm_available():
+        if verbose:
+            print(f"[LLM] No API key, using heuristic scoring")
+        return _heuristic_rank(candidates, top_k)
+
+    candidates = candidates[:20]
     try:
-        resp = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role":"system","content":"You rank travel options."},
-                      {"role":"user","content":prompt}],
-            temperature=1.0,
-            max_tokens=400
-        )
-        text = resp.choices[0].message.content
+        ranked = fetch_llm_ranking(role, candidates, context, top_k)
         if verbose:
             print(f"[LLM] Received ranking response for {role}")
-        # try to extract JSON
-        text = text.strip()
-        # If the model returns text with backticks, remove them
-        if text.startswith("```"):
-            # strip code fences
-            text = "\n".join(line for line in text.splitlines() if not line.startswith("```"))
-        parsed = json.loads(text)
-        # ensure list
-        if isinstance(parsed, list):
-            return parsed[:top_k]
-        # otherwise fallback
-        return []
+        return ranked
     except Exception as e:
+        # the local ranking, even when unsure, beats the price/rating heuristic
+        if local_ranked is not None:
+            if verbose:
+                print(f"[LLM] Error during ranking, using local ranker fallback: {str(e)}")
+            return local_ranked
         if verbose:
             print(f"[LLM] Error during ranking, using heuristic fallback: {str(e)}")
         # fallback heuristic
-        scored = []
-        for c in candidates:
-            price = float(c.get("price", c.get("price_per_night", c.get("estimated_price", 0)) or 0) or 0)
-            rating = float(c.get("rating", 0) or 0)
-            score = max(1, 100 - price + rating)
-            c_copy = dict(c)
-            c_copy["score"] = round(score,2)
-            scored.append(c_copy)
-        scored_sorted = sorted(scored, key=lambda x: -x["score"])
-        return scored_sorted[:top_k]
+        return _heuristic_rank(candidates, top_k)
+
+def score_items_via_llm(role: str, candidates: List[Dict[str, Any]], context: Dict[str, Any], verbose: bool = False) -> List[Dict[str, Any]]:
+    """
+    Score every candidate, in input order (rank_items_via_llm() returns only the top ones, best first).
+    Up to 20 candidates are scored in one call; larger sets are scored in slices of 20, whose scores come
+    from separate calls and are only roughly comparable across slices. Candidates a ranking leaves out
+    get the heuristic score.
+    """
+    scored = []
+    for start in range(0, len(candidates), 20):
+        chunk = candidates[start:start + 20]
+        ranked = rank_items_via_llm(role, chunk, context, top_k=len(chunk), verbose=verbose)
+        for c in chunk:
+            plain = {k: v for k, v in c.items() if k != "score"}
+            match = next((r for r in ranked if {k: v for k, v in r.items() if k != "score"} == plain), None)
+            scored.append(match if match is not None else _heuristic_rank([c], 1)[0])
+    return scored
 
 def summarize_plan_via_llm(plan: Dict[str, Any], verbose: bool = False) -> str:
     """
-    Ask OpenAI to create a human-friendly itinerary summary.
+    Ask OpenAI to create a human-friendly itinerary narrative (one full LLM round-trip).
+    Falls back to the template itinerary if OpenAI is unavailable or fails.
     """
     if verbose:
         print(f"[LLM] Generating plan summary...")
     
-    if not client:
+    if not _llm_available():
         if verbose:
-            print(f"[LLM] No API key, using local summary")
-        # simple local summary
-        s = []
-        s.append(f"Trip for {plan.get('nights')} nights. Budget: {plan['costs'].get('budget')}.")
-        s.append(f"Flight: {plan['chosen_flight']}")
-        s.append(f"Hotel: {plan['chosen_hotel']}")
-        s.append(f"Restaurants: {plan['chosen_restaurants']}")
-        s.append(f"Costs: {plan['costs']}")
-        return "\n".join(s)
+            print(f"[LLM] No API key, using template itinerary")
+        return render_itinerary(plan)
 
     prompt = f"""
 Given the following travel plan, produce a concise, user-friendly itinerary.
@@ -126,25 +395,18 @@ Create a well-formatted itinerary. If total cost is under budget, mention the sa
 Return only the formatted itinerary text.
 """
     try:
-        resp = client.chat.completions.create(
+        text = _chat(
             model=MODEL,
             messages=[{"role":"system","content":"You are a helpful travel assistant."},
                       {"role":"user","content":prompt}],
             temperature=1.0,
             max_tokens=400
-        )
-        text = resp.choices[0].message.content.strip()
+        ).strip()
         if verbose:
             print(f"[LLM] Summary generated successfully")
         return text
     except Exception:
         if verbose:
             print(f"[LLM] Error generating summary, using local fallback")
-        # fallback to local summary
-        s = []
-        s.append(f"Trip for {plan.get('nights')} nights. Budget: {plan['costs'].get('budget')}.")
-        s.append(f"Flight: {plan['chosen_flight']}")
-        s.append(f"Hotel: {plan['chosen_hotel']}")
-        s.append(f"Restaurants: {plan['chosen_restaurants']}")
-        s.append(f"Costs: {plan['costs']}")
-        return "\n".join(s)
+        # fallback to the template itinerary
+        return render_itinerary(plan)
@@ -0,0 +1,86 @@
+from typing import List, Dict, Any, Optional, Tuple
+from travel_planner.utils import item_price, restaurant_price
+
+def _score(item: Dict[str, Any]) -> float:
+    return float(item.get("score", 0) or 0)
+
+def _flight_cost(flight: Optional[Dict[str, Any]]) -> float:
+    return item_price(flight, "price") if flight else 0.0
+
+def _hotel_cost(hotel: Optional[Dict[str, Any]], nights: int) -> float:
+    return item_price(hotel, "price_per_night") * nights if hotel else 0.0
+
+def _best_swap(options: List[Dict[str, Any]], current: int, cost) -> Optional[Tuple[float, float, int]]:
+    """Cheapest score loss per dollar saved among cheaper alternatives: (ratio, saving, index)."""
+    best = None
+    for j, alt in enumerate(options):
+        saving = cost(options[current]) - cost(alt)
+        if saving <= 0:
+            continue
+        ratio = (_score(options[current]) - _score(alt)) / saving
+        if best is None or ratio < best[0]:
+            best = (ratio, saving, j)
+    return best
+
+def optimize_legs(legs: List[Dict[str, Any]], budget: float) -> List[Dict[str, Any]]:
+    """
+    Joint budget optimization across all legs of a trip.
+
+    Each leg provides ranked (scored, best first) "flights", "hotels" and "restaurants" plus "nights".
+    Every leg starts from its best-scored flight and hotel and all of its ranked restaurants; while the
+    trip is over budget, the single move with the lowest score loss per dollar saved, anywhere in the
+    trip, is applied (a cheaper flight or hotel, or dropping a restaurant), so savings come from wherever
+    they hurt the least instead of from fixed per-leg shares.
+    Returns one selection per leg: chosen_flight, chosen_hotel, chosen_restaurants, costs.
+    """
+    flight_idx = [0 if leg["flights"] else None for leg in legs]
+    hotel_idx = [0 if leg["hotels"] and leg["nights"] else None for leg in legs]
+    restaurants = [list(leg["restaurants"]) for leg in legs]
+
+    def total() -> float:
+        t = 0.0
+        for i, leg in enumerate(legs):
+            if flight_idx[i] is not None:
+                t += _flight_cost(leg["flights"][flight_idx[i]])
+            if hotel_idx[i] is not None:
+                t += _hotel_cost(leg["hotels"][hotel_idx[i]], leg["nights"])
+            t += sum(restaurant_price(r) for r in restaurants[i])
+        return round(t, 2)
+
+    while total() > budget:
+        moves = []
+        for i, leg in enumerate(legs):
+            if flight_idx[i] is not None:
+                swap = _best_swap(leg["flights"], flight_idx[i], _flight_cost)
+                if swap:
+                    moves.append((swap[0], -swap[1], "flight", i, swap[2]))
+            if hotel_idx[i] is not None:
+                swap = _best_swap(leg["hotels"], hotel_idx[i], lambda h, n=leg["nights"]: _hotel_cost(h, n))
+                if swap:
+                    moves.append((swap[0], -swap[1], "hotel", i, swap[2]))
+            for j, r in enumerate(restaurants[i]):
+                saving = restaurant_price(r)
+                if saving > 0:
+                    moves.append((_score(r) / saving, -saving, "restaurant", i, j))
+        if not moves:
+            break
+        _, _, kind, i, j = min(moves)
+        if kind == "flight":
+            flight_idx[i] = j
+        elif kind == "hotel":
+            hotel_idx[i] = j
+        else:
+            restaurants[i].pop(j)
+
+    selections = []
+    for i, leg in enumerate(legs):
+        flight = leg["flights"][flight_idx[i]] if flight_idx[i] is not None else None
+        hotel = leg["hotels"][hotel_idx[i]] if hotel_idx[i] is not None else None
+        costs = {
+            "flight": round(_flight_cost(flight), 2),
+            "hotel": round(_hotel_cost(hotel, leg["nights"]), 2),
+            "restaurant": round(sum(restaurant_price(r) for r in restaurants[i]), 2)
+        }
+        costs["subtotal"] = round(costs["flight"] + costs["hotel"] + costs["restaurant"], 2)
+        selections.append({"chosen_flight": flight, "chosen_hotel": hotel, "chosen_restaurants": restaurants[i], "costs": costs})
+    return selections
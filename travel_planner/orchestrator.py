@@ -1,16 +1,30 @@
-from typing import Dict, Any, Optional
-from travel_planner.langgraph_adapter import LangGraphAdapter
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from travel_planner.langgraph_adapter import LangGraphAdapter, CheckpointStore
 from travel_planner.agents.flight_agent import FlightAgent
 from travel_planner.agents.hotel_agent import HotelAgent
 from travel_planner.agents.restaurant_agent import RestaurantAgent
-from travel_planner.utils import nights_between, allocate_budget, close_to_budget
-from travel_planner.llm.openai_client import rank_items_via_llm, summarize_plan_via_llm
+from travel_planner.utils import nights_between, allocate_budget, close_to_budget, restaurant_price
+from travel_planner.sweep import sweep_selection
+from travel_planner.itinerary import render_itinerary, render_multi_city_itinerary
+from travel_planner.multi_city import optimize_legs
+from travel_planner.price_history import PriceHistory
+from travel_planner.pareto import pareto_prune
+from travel_planner.config import settings
+from travel_planner.ratelimit import RateLimitExceeded
+from travel_planner.llm.openai_client import rank_items_via_llm, score_items_via_llm, summarize_plan_via_llm
 from math import inf
 
 class TravelPlannerOrchestrator:
     def __init__(self, verbose: bool = False):
         self.verbose = verbose
         self.graph = LangGraphAdapter()
+        self.checkpoints = CheckpointStore()
+        self.price_history = PriceHistory()
+        self._speculation = {"plans": 0, "launched": 0, "hits": 0, "wasted": 0, "missed": 0}
+        self._speculation_lock = threading.Lock()
         self.flight_agent = FlightAgent(verbose=verbose)
         self.hotel_agent = HotelAgent(verbose=verbose)
         self.restaurant_agent = RestaurantAgent(verbose=verbose)
@@ -18,6 +32,9 @@ class TravelPlannerOrchestrator:
         self.graph.add_node("flight_agent", self._flight_node)
         self.graph.add_node("hotel_agent", self._hotel_node)
         self.graph.add_node("restaurant_agent", self._restaurant_node)
+        # cheaper-tier queries launched speculatively alongside the initial fan-out
+        self.graph.add_node("hotel_relaxation", self._hotel_node)
+        self.graph.add_node("flight_relaxation", self._flight_node)
     
     def _log(self, message: str):
         if self.verbose:
@@ -33,6 +50,59 @@ class TravelPlannerOrchestrator:
     def _restaurant_node(self, destination, cuisine, limit):
         return self.restaurant_agent.search(destination=destination, cuisine=cuisine, limit=limit)
 
+    def _relaxation_query(self, node, **kwargs):
+        # a rate-limited upstream (fail-fast mode) just skips this relaxation step
+        try:
+            return node(**kwargs)
+        except RateLimitExceeded as e:
+            self._log(f"  - Skipped re-query: {str(e)}")
+            return []
+
+    def _speculative_queries(self, origin: str, destination: str, nights: int, budget: float, allocation: Dict[str, float]) -> List[str]:
+        """
+        Predict which relaxation re-queries a plan will reach, from the route's typical cheapest flight,
+        cheapest hotel night and ranked (first-choice) hotel night. Restaurant pruning alone can absorb any
+        overage not caused by flight + hotel, so the cheaper-hotel query is needed when the expected flight +
+        first-choice hotel cost exceeds the budget, and the cheaper-flight query when that still holds after
+        swapping to the cheapest hotel under 80% of the per-night cap (the largest saving the swap can make).
+        Unknown routes are never speculated on.
+        """
+        flight_level = self.price_history.level("flight", PriceHistory.route(origin, destination))
+        cheapest_night = self.price_history.level("hotel", PriceHistory.route(destination))
+        if flight_level is None:
+            return []
+        cap = round(allocation["hotel"] / max(nights,1), 2)
+        # agents only return hotels under the per-night cap, so an unaffordable hotel costs nothing and
+        # the ranked choice never costs more than the cap
+        hotel_cost = alt_hotel_cost = 0
+        if cheapest_night is not None and cheapest_night <= cap:
+            chosen_night = self.price_history.level("hotel_choice", PriceHistory.route(destination)) or cheapest_night
+            hotel_cost = alt_hotel_cost = min(max(chosen_night, cheapest_night), cap) * nights
+            if cheapest_night <= round(cap*0.8,2):
+                alt_hotel_cost = min(hotel_cost, cheapest_night * nights)
+        limit = settings.SPECULATION_THRESHOLD * budget
+        queries = []
+        if flight_level + hotel_cost > limit:
+            queries.append("hotel_relaxation")
+            if flight_level + alt_hotel_cost > limit:
+                queries.append("flight_relaxation")
+        return queries
+
+    def _count_speculation(self, **increments):
+        with self._speculation_lock:
+            for k, v in increments.items():
+                self._speculation[k] += v
+
+    def speculation_stats(self) -> Dict[str, Any]:
+        """
+        Speculative relaxation queries: launched (run in a fan-out), used (hits), discarded or errored (wasted),
+        and serial re-queries that speculation was enabled for but did not predict (missed).
+        """
+        with self._speculation_lock:
+            stats = dict(self._speculation)
+        stats["hit_rate"] = round(stats["hits"] / stats["launched"], 4) if stats["launched"] else None
+        return stats
+
     def plan(self,
              origin: str,
              destination: str,
@@ -43,7 +113,237 @@ class TravelPlannerOrchestrator:
              passengers: int = 1,
              stars_preference: Optional[int] = None,
              allocation_override: Optional[Dict[str, float]] = None,
-             tolerance: float = 0.05) -> Dict[str, Any]:
+             tolerance: float = 0.05,
+             plan_id: Optional[str] = None) -> Dict[str, Any]:
+        params = {
+            "origin": origin,
+            "destination": destination,
+            "start_date": start_date,
+            "end_date": end_date,
+            "budget": budget,
+            "cuisine": cuisine,
+            "passengers": passengers,
+            "stars_preference": stars_preference,
+            "allocation_override": allocation_override,
+            "tolerance": tolerance
+        }
+        plan_id = plan_id or uuid.uuid4().hex
+        state = self._run(params)
+        self.checkpoints.put(plan_id, state)
+        plan = state["plan"]
+        plan["plan_id"] = plan_id
+        return plan
+
+    def replan(self, plan_id: str, **changes) -> Dict[str, Any]:
+        """
+        Re-plan a checkpointed plan with some parameters changed (e.g. budget, cuisine, allocation_override).
+        Only the stages whose inputs changed are recomputed; everything else is reused from the checkpoint.
+        """
+        previous = self.checkpoints.get(plan_id)
+        if previous is None:
+            raise KeyError(f"Unknown plan_id: {plan_id}")
+        unknown = set(changes) - set(previous["params"])
+        if unknown:
+            raise ValueError(f"Unknown plan parameters: {', '.join(sorted(unknown))}")
+        self._log(f"Re-planning {plan_id} with changes: {changes}")
+        state = self._run({**previous["params"], **changes}, previous)
+        self.checkpoints.put(plan_id, state)
+        plan = state["plan"]
+        plan["plan_id"] = plan_id
+        return plan
+
+    def summarize(self, plan: str | Dict[str, Any]) -> str:
+        """
+        Rich LLM narrative for a plan, given the plan dict returned by plan()/replan() or its plan_id.
+        plan() only renders the template itinerary, so the LLM round-trip is paid only by callers that ask
+        for it; the narrative is kept in the checkpoint (and in the given plan dict). A plan dict is
+        summarized even after its checkpoint expired or was evicted; a bare plan_id needs the checkpoint.
+        """
+        plan_id = plan if isinstance(plan, str) else plan.get("plan_id")
+        state = self.checkpoints.get(plan_id) if plan_id else None
+        if state is None and isinstance(plan, str):
+            raise KeyError(f"Unknown plan_id: {plan_id}")
+        source = state["plan"] if state is not None else plan
+        narrative = source.get("narrative")
+        if narrative is None:
+            self._log("Requesting LLM to generate summary...")
+            narrative = summarize_plan_via_llm(source, verbose=self.verbose)
+            if state is not None:
+                state["plan"]["narrative"] = narrative
+                self.checkpoints.put(plan_id, state)
+        if not isinstance(plan, str):
+            plan["narrative"] = narrative
+        return narrative
+
+    def sweep_budgets(self,
+                      origin: str,
+                      destination: str,
+                      start_date: str,
+                      end_date: str,
+                      budgets: List[float],
+                      allocations: Optional[List[Optional[Dict[str, float]]]] = None,
+                      cuisine: Optional[str] = None,
+                      passengers: int = 1,
+                      stars_preference: Optional[int] = None,
+                      tolerance: float = 0.05) -> Dict[str, List[Any]]:
+        """
+        Budget sensitivity sweep: fetch and score candidates once, then compute the selection and cost
+        breakdown for every budget x allocation pair in one vectorized pass.
+        Returns a columnar table (column name -> list), one row per (allocation, budget).
+        """
+        nights = nights_between(start_date, end_date)
+        if nights <= 0:
+            raise ValueError("end_date must be after start_date")
+        self._log(f"Budget sweep: {origin} -> {destination}, {len(budgets)} budgets x {len(allocations or [None])} allocations")
+
+        calls = {
+            "flight_agent": {
+                "origin": origin,
+                "destination": destination,
+                "depart_date": start_date,
+                "return_date": end_date,
+                "passengers": passengers,
+                "flight_budget": None
+            },
+            "hotel_agent": {
+                "destination": destination,
+                "check_in": start_date,
+                "check_out": end_date,
+                "max_price_per_night": None,
+                "stars_preference": stars_preference
+            },
+            "restaurant_agent": {
+                "destination": destination,
+                "cuisine": cuisine,
+                "limit": max(6, nights*2)
+            }
+        }
+        raw = self.graph.run_nodes_parallel(calls, max_workers=3)
+        flights = raw.get("flight_agent") if isinstance(raw.get("flight_agent"), list) else []
+        hotels = raw.get("hotel_agent") if isinstance(raw.get("hotel_agent"), list) else []
+        restaurants = raw.get("restaurant_agent") if isinstance(raw.get("restaurant_agent"), list) else []
+        self._log(f"Agent results: {len(flights)} flights, {len(hotels)} hotels, {len(restaurants)} restaurants")
+
+        # Score every candidate once; budgets and the per-budget Pareto pools are applied by the vectorized selection
+        context = {"destination": destination, "start_date": start_date, "end_date": end_date, "cuisine": cuisine}
+        scored_flights = score_items_via_llm("flight", flights, context, verbose=self.verbose)
+        scored_hotels = score_items_via_llm("hotel", hotels, context, verbose=self.verbose)
+        # the restaurant pool does not depend on the budget, so it is pruned and ranked exactly as in plan()
+        top_restaurants = pareto_prune("restaurant", restaurants, cap=10, min_keep=6)
+        ranked_restaurants = rank_items_via_llm("restaurant", top_restaurants, {**context, "nights": nights}, top_k=6, verbose=self.verbose) if top_restaurants else []
+
+        table = sweep_selection(scored_flights, scored_hotels, ranked_restaurants, nights, budgets, allocations, tolerance)
+        self._log(f"Sweep complete: {len(table['budget'])} rows")
+        return table
+
+    def plan_multi_city(self,
+                        cities: List[str],
+                        dates: List[str],
+                        budget: float,
+                        cuisine: Optional[str] = None,
+                        passengers: int = 1,
+                        stars_preference: Optional[int] = None,
+                        return_to_origin: bool = False,
+                        tolerance: float = 0.05) -> Dict[str, Any]:
+        """
+        Multi-city trip: cities[0] is the origin and every following city is a stop. dates[i] is the day the
+        traveler leaves cities[i] (so the stay in cities[i] runs from dates[i-1] to dates[i]); len(dates) must
+        equal len(cities). With return_to_origin a final flight back to cities[0] departs on dates[-1].
+
+        Flight, hotel and restaurant searches for every leg are fanned out at once (identical queries run
+        once), all rankings run concurrently, and the total budget is optimized jointly across legs.
+        """
+        if len(cities) < 2 or len(dates) != len(cities):
+            raise ValueError("Need at least two cities and one date per city")
+        legs = []
+        for i in range(1, len(cities)):
+            nights = nights_between(dates[i-1], dates[i])
+            if nights <= 0:
+                raise ValueError(f"Dates must be increasing: {dates[i-1]} -> {dates[i]}")
+            legs.append({"from": cities[i-1], "to": cities[i], "depart_date": dates[i-1], "check_out": dates[i], "nights": nights})
+        if return_to_origin:
+            legs.append({"from": cities[-1], "to": cities[0], "depart_date": dates[-1], "check_out": None, "nights": 0})
+        self._log(f"Multi-city planning: {' -> '.join(leg['from'] for leg in legs)} -> {legs[-1]['to']}, {len(legs)} legs, Budget: ${budget}")
+
+        # Stage 1: fetch every leg at once; budgets are applied by the joint optimization, so nothing is pre-filtered
+        tasks = {}
+        for i, leg in enumerate(legs):
+            tasks[f"{i}:flight"] = ("flight_agent", {
+                "origin": leg["from"],
+                "destination": leg["to"],
+                "depart_date": leg["depart_date"],
+                "return_date": None,
+                "passengers": passengers,
+                "flight_budget": None
+            })
+            if leg["nights"]:
+                tasks[f"{i}:hotel"] = ("hotel_agent", {
+                    "destination": leg["to"],
+                    "check_in": leg["depart_date"],
+                    "check_out": leg["check_out"],
+                    "max_price_per_night": None,
+                    "stars_preference": stars_preference
+                })
+                tasks[f"{i}:restaurant"] = ("restaurant_agent", {
+                    "destination": leg["to"],
+                    "cuisine": cuisine,
+                    "limit": max(6, leg["nights"]*2)
+                })
+        self._log(f"Executing {len(tasks)} agent tasks in parallel...")
+        raw = self.graph.run_tasks_parallel(tasks, max_workers=len(tasks))
+
+        # Stage 2: Pareto-prune and rank every (leg, role) concurrently
+        rank_jobs = {}
+        for i, leg in enumerate(legs):
+            context = {"destination": leg["to"], "start_date": leg["depart_date"], "end_date": leg["check_out"], "cuisine": cuisine}
+            flights = pareto_prune("flight", raw.get(f"{i}:flight"), cap=5)
+            hotels = pareto_prune("hotel", raw.get(f"{i}:hotel"), cap=5)
+            restaurants = pareto_prune("restaurant", raw.get(f"{i}:restaurant"), cap=10, min_keep=6)
+            rank_jobs[(i, "flight")] = (flights, context, len(flights))
+            rank_jobs[(i, "hotel")] = (hotels, context, len(hotels))
+            rank_jobs[(i, "restaurant")] = (restaurants, {**context, "nights": leg["nights"]}, 6)
+        self._log(f"Requesting LLM to rank {len(rank_jobs)} candidate sets...")
+        ranked = {}
+        with ThreadPoolExecutor(max_workers=len(rank_jobs)) as ex:
+            futures = {key: ex.submit(rank_items_via_llm, key[1], cands, ctx, top_k, self.verbose)
+                       for key, (cands, ctx, top_k) in rank_jobs.items() if cands}
+            for key in rank_jobs:
+                ranked[key] = futures[key].result() if key in futures else []
+
+        # Stage 3: joint budget optimization across legs
+        options = [{"flights": ranked[(i, "flight")], "hotels": ranked[(i, "hotel")],
+                    "restaurants": ranked[(i, "restaurant")], "nights": leg["nights"]} for i, leg in enumerate(legs)]
+        selections = optimize_legs(options, budget)
+        costs = {k: round(sum(sel["costs"][k] for sel in selections), 2) for k in ("flight", "hotel", "restaurant", "subtotal")}
+        costs["budget"] = round(budget, 2)
+        self._log(f"Final costs: Flight=${costs['flight']}, Hotel=${costs['hotel']}, Restaurant=${costs['restaurant']}, Subtotal=${costs['subtotal']}")
+
+        trip = {
+            "cities": list(cities) + ([cities[0]] if return_to_origin else []),
+            "legs": [{**leg, **sel} for leg, sel in zip(legs, selections)],
+            "nights": sum(leg["nights"] for leg in legs),
+            "costs": costs,
+            "within_tolerance": close_to_budget(costs["subtotal"], budget, tolerance),
+            "notes": "LLM used to assist ranking; budget optimized jointly across legs."
+        }
+        trip["summary"] = render_multi_city_itinerary(trip)
+        self._log("Multi-city planning complete!")
+        return trip
+
+    def _run(self, params: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run the planning stages (fetch -> rank -> select/relax -> summary) and return the full state
+        to checkpoint. When `previous` is given, stages whose inputs are unchanged reuse its results.
+        """
+        origin = params["origin"]
+        destination = params["destination"]
+        start_date = params["start_date"]
+        end_date = params["end_date"]
+        budget = params["budget"]
+        cuisine = params["cuisine"]
+        passengers = params["passengers"]
+        stars_preference = params["stars_preference"]
+        tolerance = params["tolerance"]
         self._log(f"Starting travel planning: {origin} -> {destination}, {start_date} to {end_date}, Budget: ${budget}")
         
         nights = nights_between(start_date, end_date)
@@ -51,7 +351,7 @@ class TravelPlannerOrchestrator:
             raise ValueError("end_date must be after start_date")
         
         self._log(f"Trip duration: {nights} nights")
-        allocation = allocate_budget(budget, allocation_override)
+        allocation = allocate_budget(budget, params["allocation_override"])
         self._log(f"Budget allocation: Flight=${allocation['flight']}, Hotel=${allocation['hotel']}, Restaurant=${allocation['restaurant']}")
         
         max_price_per_night = round(allocation["hotel"] / max(nights,1), 2)
@@ -78,44 +378,86 @@ class TravelPlannerOrchestrator:
                 "limit": max(6, nights*2)
             }
         }
+        # Speculation: relaxation re-queries predicted from route price history join the first fan-out
+        speculative = self._speculative_queries(origin, destination, nights, budget, allocation) if settings.SPECULATIVE_RELAXATION else []
+        if "hotel_relaxation" in speculative:
+            calls["hotel_relaxation"] = {**calls["hotel_agent"], "max_price_per_night": round(max_price_per_night*0.8,2)}
+        if "flight_relaxation" in speculative:
+            calls["flight_relaxation"] = {**calls["flight_agent"], "flight_budget": round(allocation["flight"]*0.9,2)}
+        if speculative:
+            self._log(f"Relaxation likely for this route and budget, launching speculatively: {', '.join(speculative)}")
+        used = set()
 
-        self._log("Executing agents in parallel...")
-        raw = self.graph.run_nodes_parallel(calls, max_workers=3)
+        # Stage 1: fetch (only agents whose call arguments changed since the checkpoint)
+        raw = {}
+        pending = {}
+        for node_name, kwargs in calls.items():
+            if previous and previous["calls"].get(node_name) == kwargs and isinstance(previous["raw"].get(node_name), list):
+                raw[node_name] = previous["raw"][node_name]
+            else:
+                pending[node_name] = kwargs
+        if previous:
+            self._log(f"Reusing checkpointed results for: {', '.join(sorted(set(calls) - set(pending))) or 'none'}")
+        if pending:
+            self._log("Executing agents in parallel...")
+            raw.update(self.graph.run_nodes_parallel(pending, max_workers=len(pending)))
         flights = raw.get("flight_agent", [])
         hotels = raw.get("hotel_agent", [])
         restaurants = raw.get("restaurant_agent", [])
+        if isinstance(flights, list) and flights:
+            self.price_history.record("flight", PriceHistory.route(origin, destination), min(f.get("price", inf) for f in flights))
+        if isinstance(hotels, list) and hotels:
+            self.price_history.record("hotel", PriceHistory.route(destination), min(h.get("price_per_night", inf) for h in hotels))
         
         self._log(f"Agent results: {len(flights)} flights, {len(hotels)} hotels, {len(restaurants)} restaurants")
 
-        # Pick candidate sets (top N)
-        top_flights = flights[:3] if isinstance(flights, list) else []
-        top_hotels = hotels[:3] if isinstance(hotels, list) else []
-        top_restaurants = restaurants[:10] if isinstance(restaurants, list) else []
+        # Pick candidate sets: Pareto-optimal options only (price vs stops/stars/rating), cheapest always kept
+        top_flights = pareto_prune("flight", flights, cap=3)
+        top_hotels = pareto_prune("hotel", hotels, cap=3)
+        # several restaurants are picked, so further fronts fill up to the 6 the ranking returns
+        top_restaurants = pareto_prune("restaurant", restaurants, cap=10, min_keep=6)
+        self._log(f"Pareto candidates: {len(top_flights)} flights, {len(top_hotels)} hotels, {len(top_restaurants)} restaurants")
 
-        # Ask LLM to rank each list (assists selection)
+        # Stage 2: ask LLM to rank each list (assists selection)
         self._log("Requesting LLM to rank candidates...")
         context = {"destination": destination, "start_date": start_date, "end_date": end_date, "cuisine": cuisine}
-        
-        self._log(f"  - Ranking {len(top_flights)} flights")
-        ranked_flights = rank_items_via_llm("flight", top_flights, {**context, "role_budget": allocation["flight"]}, top_k=3, verbose=self.verbose) if top_flights else []
-        
-        self._log(f"  - Ranking {len(top_hotels)} hotels")
-        ranked_hotels = rank_items_via_llm("hotel", top_hotels, {**context, "role_budget": allocation["hotel"]}, top_k=3, verbose=self.verbose) if top_hotels else []
-        
-        self._log(f"  - Ranking {len(top_restaurants)} restaurants")
-        ranked_restaurants = rank_items_via_llm("restaurant", top_restaurants, {**context, "role_budget": allocation["restaurant"], "nights": nights}, top_k=6, verbose=self.verbose) if top_restaurants else []
+        rank_jobs = {
+            "flight": (top_flights, {**context, "role_budget": allocation["flight"]}, 3),
+            "hotel": (top_hotels, {**context, "role_budget": allocation["hotel"]}, 3),
+            "restaurant": (top_restaurants, {**context, "role_budget": allocation["restaurant"], "nights": nights}, 6)
+        }
+        # A checkpointed ranking stays valid while its candidates and preferences are unchanged. The role
+        # budget alone does not invalidate it (budgets are enforced by selection and relaxation below),
+        # and cuisine only matters for restaurants.
+        rank_inputs = {}
+        for role, (cands, ctx, top_k) in rank_jobs.items():
+            ignored = ("role_budget",) if role == "restaurant" else ("role_budget", "cuisine")
+            rank_inputs[role] = {"candidates": cands, "context": {k: v for k, v in ctx.items() if k not in ignored}, "top_k": top_k}
+        ranked = {}
+        for role, (cands, ctx, top_k) in rank_jobs.items():
+            if previous and previous["rank_inputs"].get(role) == rank_inputs[role]:
+                self._log(f"  - Reusing checkpointed {role} ranking")
+                ranked[role] = previous["ranked"][role]
+                continue
+            self._log(f"  - Ranking {len(cands)} {role}s")
+            ranked[role] = rank_items_via_llm(role, cands, ctx, top_k=top_k, verbose=self.verbose) if cands else []
+        ranked_flights = ranked["flight"]
+        ranked_hotels = ranked["hotel"]
+        ranked_restaurants = ranked["restaurant"]
 
-        # Choose best candidates from LLM outputs (or fallback heuristics)
+        # Stage 3: choose best candidates from LLM outputs (or fallback heuristics)
         chosen_flight = ranked_flights[0] if ranked_flights else (top_flights[0] if top_flights else None)
         chosen_hotel = ranked_hotels[0] if ranked_hotels else (top_hotels[0] if top_hotels else None)
         
         self._log(f"Selected: Flight={chosen_flight.get('airline') if chosen_flight else 'None'}, Hotel={chosen_hotel.get('name') if chosen_hotel else 'None'}")
+        if chosen_hotel:
+            self.price_history.record("hotel_choice", PriceHistory.route(destination), chosen_hotel.get("price_per_night"))
 
         # Greedy restaurants pick until restaurant allocation exhausted
         chosen_restaurants = []
         remaining_rest_budget = allocation["restaurant"]
         for r in ranked_restaurants:
-            price = r.get("estimated_price", 0) or r.get("avg_price", 0) or r.get("price", 0)
+            price = restaurant_price(r)
             if price == 0:
                 chosen_restaurants.append(r)
                 continue
@@ -128,7 +470,7 @@ class TravelPlannerOrchestrator:
         # compute costs
         flight_cost = chosen_flight.get("price", 0) if chosen_flight else 0
         hotel_cost = (chosen_hotel.get("price_per_night", 0) * nights) if chosen_hotel else 0
-        restaurants_cost = sum(r.get("estimated_price", 0) or r.get("avg_price", 0) for r in chosen_restaurants)
+        restaurants_cost = sum(restaurant_price(r) for r in chosen_restaurants)
         subtotal = round(flight_cost + hotel_cost + restaurants_cost, 2)
         
         self._log(f"Initial costs: Flight=${flight_cost}, Hotel=${hotel_cost}, Restaurant=${restaurants_cost}, Subtotal=${subtotal}")
@@ -137,16 +479,26 @@ class TravelPlannerOrchestrator:
         if subtotal > budget:
             self._log(f"Over budget by ${subtotal - budget}. Starting progressive relaxation...")
             # 1) prune restaurants (remove most expensive)
-            chosen_restaurants.sort(key=lambda x: x.get("estimated_price",0), reverse=True)
+            # restaurants priced by avg_price/price are pruned by that price too
+            chosen_restaurants.sort(key=restaurant_price, reverse=True)
             while chosen_restaurants and subtotal > budget:
                 removed = chosen_restaurants.pop(0)
-                subtotal = round(subtotal - removed.get("estimated_price",0),2)
+                restaurants_cost = round(restaurants_cost - restaurant_price(removed), 2)
+                subtotal = round(flight_cost + hotel_cost + restaurants_cost, 2)
                 self._log(f"  - Removed restaurant: {removed.get('name')}, New subtotal=${subtotal}")
 
         if subtotal > budget:
             self._log("  - Searching for cheaper hotels (80% budget)...")
             # 2) ask hotel agent for cheaper hotels (reduce per-night to 80%)
-            alt_hotels = self._hotel_node(destination=destination, check_in=start_date, check_out=end_date, max_price_per_night=round(max_price_per_night*0.8,2), stars_preference=stars_preference)
+            if isinstance(raw.get("hotel_relaxation"), list):
+                self._log("  - Using speculative hotel results")
+                alt_hotels = raw["hotel_relaxation"]
+                used.add("hotel_relaxation")
+            else:
+                alt_hotels = self._relaxation_query(self._hotel_node, destination=destination, check_in=start_date, check_out=end_date, max_price_per_night=round(max_price_per_night*0.8,2), stars_preference=stars_preference)
+                # a miss is a re-query speculation was enabled for but did not predict (an errored speculative node is not)
+                if settings.SPECULATIVE_RELAXATION and "hotel_relaxation" not in calls:
+                    self._count_speculation(missed=1)
             if alt_hotels:
                 alt_h = alt_hotels[0]
                 alt_cost = alt_h.get("price_per_night",0) * nights
@@ -159,7 +511,15 @@ class TravelPlannerOrchestrator:
         if subtotal > budget:
             self._log("  - Searching for cheaper flights (90% budget)...")
             # 3) ask flight agent for cheaper flights below current flight allocation*0.9
-            alt_flights = self._flight_node(origin=origin, destination=destination, depart_date=start_date, return_date=end_date, passengers=passengers, flight_budget=round(allocation["flight"]*0.9,2))
+            if isinstance(raw.get("flight_relaxation"), list):
+                self._log("  - Using speculative flight results")
+                alt_flights = raw["flight_relaxation"]
+                used.add("flight_relaxation")
+            else:
+                alt_flights = self._relaxation_query(self._flight_node, origin=origin, destination=destination, depart_date=start_date, return_date=end_date, passengers=passengers, flight_budget=round(allocation["flight"]*0.9,2))
+                # a miss is a re-query speculation was enabled for but did not predict (an errored speculative node is not)
+                if settings.SPECULATIVE_RELAXATION and "flight_relaxation" not in calls:
+                    self._count_speculation(missed=1)
             if alt_flights:
                 alt_f = alt_flights[0]
                 if alt_f.get("price",inf) < flight_cost:
@@ -168,6 +528,12 @@ class TravelPlannerOrchestrator:
                     flight_cost = alt_f.get("price",0)
                     subtotal = round(flight_cost + hotel_cost + restaurants_cost,2)
         
+        # only queries actually run now count; speculative results reused from a checkpoint launched nothing
+        launched = [name for name in speculative if name in pending]
+        if launched:
+            hits = len(used.intersection(launched))
+            self._count_speculation(plans=1, launched=len(launched), hits=hits, wasted=len(launched) - hits)
+            self._log(f"Speculative queries used: {hits}/{len(launched)}")
         self._log(f"Final costs: Flight=${flight_cost}, Hotel=${hotel_cost}, Restaurant=${restaurants_cost}, Subtotal=${subtotal}")
 
         within_tolerance = close_to_budget(subtotal, budget, tolerance)
@@ -188,9 +554,19 @@ class TravelPlannerOrchestrator:
             "notes": "LLM used to assist ranking; orchestrator performed progressive relaxation."
         }
 
-        # Ask LLM to generate final textual itinerary
-        self._log("Requesting LLM to generate summary...")
-        plan_summary = summarize_plan_via_llm(plan, verbose=self.verbose)
-        plan["summary"] = plan_summary
+        # Stage 4: template itinerary; the LLM narrative is generated on demand by summarize()
+        plan["summary"] = render_itinerary(plan)
+        previous_plan = {k: v for k, v in previous["plan"].items() if k not in ("narrative", "plan_id")} if previous else None
+        if previous_plan == plan and previous["plan"].get("narrative") is not None:
+            self._log("Plan unchanged, keeping checkpointed narrative")
+            plan["narrative"] = previous["plan"]["narrative"]
         self._log("Planning complete!")
-        return plan
+        return {
+            "params": params,
+            "calls": calls,
+            "raw": raw,
+            "rank_inputs": rank_inputs,
+            "ranked": ranked,
+            "allocation": allocation,
+            "plan": plan
+        }
@@ -0,0 +1,96 @@
+from typing import List, Dict, Any
+import numpy as np
+from travel_planner.utils import RESTAURANT_PRICE_FIELDS, item_price
+
+# Objectives per role as (field(s), direction): +1 minimize, -1 maximize. Missing values count as 0.
+OBJECTIVES = {
+    "flight": [(("price",), 1), (("stops",), 1), (("rating",), -1)],
+    "hotel": [(("price_per_night",), 1), (("stars",), -1), (("rating",), -1)],
+    "restaurant": [(RESTAURANT_PRICE_FIELDS, 1), (("rating",), -1)],
+}
+
+def objective_matrix(role: str, items: List[Dict[str, Any]]) -> np.ndarray:
+    """(n, k) matrix of the role's objectives, all oriented so that lower is better."""
+    objectives = OBJECTIVES.get(role, [(("price",), 1), (("rating",), -1)])
+    return np.array([[sign * item_price(item, *fields) for fields, sign in objectives] for item in items], dtype=float).reshape(len(items), len(objectives))
+
+def _dominates(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """[i, j] is True when a[j] dominates b[i] (no worse in every objective, better in at least one)."""
+    return (a[None, :, :] <= b[:, None, :]).all(axis=2) & (a[None, :, :] < b[:, None, :]).any(axis=2)
+
+def _non_dominated_2d(ordered: np.ndarray) -> np.ndarray:
+    """
+    non_dominated() for two objectives, on rows already in lexicographic order: a row is dominated exactly
+    when some earlier, non-identical row has a second objective no worse than its own, so a running
+    minimum decides every row in O(n) after the sort.
+    """
+    first, second = ordered[:, 0], ordered[:, 1]
+    n = len(ordered)
+    # identical rows do not dominate each other, so each row is compared with the rows before its group
+    new_group = np.r_[True, (first[1:] != first[:-1]) | (second[1:] != second[:-1])]
+    group_start = np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+    best_before = np.r_[np.inf, np.minimum.accumulate(second)[:-1]]
+    return ~(best_before[group_start] <= second)
+
+def non_dominated(points: np.ndarray, chunk: int = 32) -> np.ndarray:
+    """
+    Boolean mask of the Pareto-optimal rows of `points` (lower is better in every column).
+    Rows are visited in lexicographic order, where a row can only be dominated by an earlier one. Two
+    objectives (restaurants) take O(n log n) via a running minimum. Otherwise each chunk is compared
+    against the front found so far (by transitivity that is enough), which costs O(n * (front size + chunk)):
+    fast when the front is small, quadratic when most candidates are on it.
+    """
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    order = np.lexsort(points.T[::-1])
+    ordered = points[order]
+    if points.shape[1] == 2:
+        keep = _non_dominated_2d(ordered)
+    else:
+        keep = np.zeros(n, dtype=bool)
+        front = np.empty_like(ordered)
+        size = 0
+        for start in range(0, n, chunk):
+            block = ordered[start:start + chunk]
+            dominated = _dominates(front[:size], block).any(axis=1) if size else np.zeros(len(block), dtype=bool)
+            dominated |= (_dominates(block, block) & np.tri(len(block), k=-1, dtype=bool)).any(axis=1)
+            keep[start:start + len(block)] = ~dominated
+            survivors = block[~dominated]
+            front[size:size + len(survivors)] = survivors
+            size += len(survivors)
+    mask = np.zeros(n, dtype=bool)
+    mask[order] = keep
+    return mask
+
+def pareto_prune(role: str, items: List[Dict[str, Any]], cap: int, min_keep: int = 1) -> List[Dict[str, Any]]:
+    """
+    Keep only non-dominated candidates (price vs rating/stars/stops), at most `cap` of them, in their
+    original order. Further fronts are added only while fewer than `min_keep` candidates are kept (for
+    roles where several picks are made). When a front must be thinned, picks are spread evenly along it
+    by price, so the cheapest option is always kept.
+    """
+    if not isinstance(items, list) or not items:
+        return []
+    return [items[i] for i in pareto_indices(role, items, cap, min_keep)]
+
+def pareto_indices(role: str, items: List[Dict[str, Any]], cap: int, min_keep: int = 1) -> List[int]:
+    """Sorted indices of the candidates pareto_prune() keeps."""
+    if not items:
+        return []
+    points = objective_matrix(role, items)
+    price = points[:, 0]
+    remaining = np.arange(len(items))
+    selected: List[int] = []
+    while remaining.size and len(selected) < cap:
+        mask = non_dominated(points[remaining])
+        front = remaining[mask]
+        remaining = remaining[~mask]
+        slots = cap - len(selected)
+        if len(front) > slots:
+            front = front[np.argsort(price[front], kind="stable")]
+            front = front[np.unique(np.round(np.linspace(0, len(front) - 1, slots)).astype(int))]
+        selected.extend(front.tolist())
+        if len(selected) >= min_keep:
+            break
+    return sorted(selected)
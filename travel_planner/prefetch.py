@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from travel_planner import cache
+
+class PrefetchScheduler:
+    """
+    Refresh-ahead scheduler for hot upstream calls.
+
+    Observes calls to registered @cached functions (flights, hotels, LLM rankings), counts how often
+    each call signature is requested, and periodically re-fetches the hottest signatures whose cached
+    value is missing or about to expire, so popular routes are served warm.
+
+    Usage:
+        scheduler = PrefetchScheduler.with_default_sources(verbose=True)
+        scheduler.start()
+        ...
+        scheduler.stats()
+        scheduler.stop()
+    """
+    def __init__(self,
+                 refresh_ahead: float = 60.0,
+                 interval: float = 10.0,
+                 top_n: int = 20,
+                 max_calls_per_cycle: int = 10,
+                 min_call_interval: float = 0.5,
+                 min_hits: int = 2,
+                 decay: float = 0.9,
+                 verbose: bool = False):
+        """
+        refresh_ahead: refresh entries expiring within this many seconds
+        interval: seconds between refresh cycles
+        top_n: number of hottest signatures considered per cycle
+        max_calls_per_cycle: upstream-call budget per cycle
+        min_call_interval: minimum seconds between two refresh calls (rate limit)
+        min_hits: signatures seen fewer times than this are never prefetched
+        decay: per-cycle multiplier applied to hit counts so popularity follows recent traffic
+        """
+        self.refresh_ahead = refresh_ahead
+        self.interval = interval
+        self.top_n = top_n
+        self.max_calls_per_cycle = max_calls_per_cycle
+        self.min_call_interval = min_call_interval
+        self.min_hits = min_hits
+        self.decay = decay
+        self.verbose = verbose
+        self._sources: Dict[str, Callable[..., Any]] = {}
+        self._hits: Dict[Tuple[str, str], float] = {}
+        self._signatures: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_call = 0.0
+        self._counters = {"cycles": 0, "refreshed": 0, "failed": 0, "skipped_budget": 0}
+
+    @classmethod
+    def with_default_sources(cls, **kwargs) -> "PrefetchScheduler":
+        from travel_planner.tools.scraper import amadeus_flights_search, fetch_hotels
+        from travel_planner.llm.openai_client import fetch_llm_ranking
+        scheduler = cls(**kwargs)
+        scheduler.register(amadeus_flights_search)
+        scheduler.register(fetch_hotels)
+        scheduler.register(fetch_llm_ranking)
+        return scheduler
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(f"[PREFETCH] {message}")
+
+    def register(self, fn: Callable[..., Any]):
+        """Track and refresh calls to a @cached function."""
+        if not hasattr(fn, "refresh"):
+            raise ValueError(f"{getattr(fn, '__name__', fn)} is not a @cached function")
+        self._sources[fn.namespace] = fn
+        cache.add_observer(self._observe)
+
+    def _observe(self, fn: Callable[..., Any], kwargs: Dict[str, Any]):
+        name = getattr(fn, "namespace", None)
+        if name not in self._sources:
+            return
+        kwargs = {k: v for k, v in kwargs.items() if k != "verbose"}
+        sig = (name, json.dumps(kwargs, sort_keys=True, default=str))
+        with self._lock:
+            self._hits[sig] = self._hits.get(sig, 0.0) + 1.0
+            self._signatures[sig] = kwargs
+
+    def hot_keys(self, n: int | None = None) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Return (source, kwargs, hits) for the n hottest signatures."""
+        with self._lock:
+            ranked = sorted(self._hits.items(), key=lambda kv: -kv[1])[:n or self.top_n]
+            return [(sig[0], dict(self._signatures[sig]), round(hits, 2)) for sig, hits in ranked]
+
+    def run_once(self) -> int:
+        """Run a single refresh cycle; returns the number of upstream refreshes performed."""
+        calls = 0
+        for name, kwargs, hits in self.hot_keys():
+            if self._stop.is_set():
+                break
+            if hits < self.min_hits:
+                continue
+            fn = self._sources[name]
+            remaining = fn.cache_ttl(**kwargs)
+            if remaining is not None and remaining > self.refresh_ahead:
+                continue
+            if calls >= self.max_calls_per_cycle:
+                self._counters["skipped_budget"] += 1
+                continue
+            wait = self.min_call_interval - (time.time() - self._last_call)
+            if wait > 0 and self._stop.wait(wait):
+                break
+            self._last_call = time.time()
+            calls += 1
+            try:
+                fn.refresh(**kwargs)
+                self._counters["refreshed"] += 1
+                self._log(f"Refreshed {name} (hits={hits}, ttl_left={remaining})")
+            except Exception as e:
+                self._counters["failed"] += 1
+                self._log(f"Refresh failed for {name}: {str(e)}")
+        with self._lock:
+            for sig in list(self._hits):
+                self._hits[sig] *= self.decay
+                if self._hits[sig] < 0.1:
+                    del self._hits[sig]
+                    del self._signatures[sig]
+        self._counters["cycles"] += 1
+        return calls
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self._log(f"Cycle error: {str(e)}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        cache.add_observer(self._observe)
+        self._thread = threading.Thread(target=self._loop, name="prefetch-scheduler", daemon=True)
+        self._thread.start()
+        self._log(f"Started (interval={self.interval}s, budget={self.max_calls_per_cycle} calls/cycle)")
+
+    def stop(self, timeout: float | None = None):
+        self._stop.set()
+        cache.remove_observer(self._observe)
+        if self._thread:
+            self._thread.join(timeout)
+        self._log("Stopped")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tracked = len(self._hits)
+        return {**self._counters, "running": self.running, "tracked_keys": tracked,
+                "hot_keys": [{"source": n, "args": a, "hits": h} for n, a, h in self.hot_keys(5)]}
@@ -0,0 +1,32 @@
+import threading
+from collections import deque
+from statistics import median
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class PriceHistory:
+    """
+    Rolling per-route price levels observed by past plans: the cheapest flight per (origin, destination),
+    and the cheapest and the ranked first-choice hotel night per destination. Used to predict whether a budget is tight enough that
+    planning will end in progressive relaxation.
+    """
+    def __init__(self, max_samples: int = 20):
+        self.max_samples = max_samples
+        self._samples: Dict[Tuple[str, Hashable], deque] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def route(*parts: Any) -> Tuple[str, ...]:
+        return tuple(str(p).strip().lower() for p in parts)
+
+    def record(self, kind: str, route: Hashable, price: float | None):
+        if not price:
+            return
+        with self._lock:
+            samples = self._samples.setdefault((kind, route), deque(maxlen=self.max_samples))
+            samples.append(float(price))
+
+    def level(self, kind: str, route: Hashable) -> Optional[float]:
+        """Typical (median) price level for a route, or None if it was never observed."""
+        with self._lock:
+            samples = self._samples.get((kind, route))
+            return median(samples) if samples else None
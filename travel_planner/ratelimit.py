@@ -0,0 +1,198 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List
+from travel_planner.config import settings
+
+class RateLimitExceeded(Exception):
+    """Raised when a permit cannot be obtained (fail-fast mode, or the wait exceeded its timeout)."""
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one token is available (0 if available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def consume(self):
+        self.tokens -= 1
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter for one upstream, shared by threads and asyncio tasks.
+
+    Permits are handed out in FIFO order (fair queuing): a caller only draws a token once every caller
+    queued before it has been served. An optional quota bucket (e.g. a monthly allowance) is enforced
+    alongside the per-second bucket.
+
+    mode="wait" blocks up to max_wait seconds for a permit; mode="fail" raises RateLimitExceeded
+    immediately when no permit is available. Both can be overridden per call.
+    """
+    def __init__(self,
+                 name: str,
+                 rate: float,
+                 burst: float | None = None,
+                 quota: int | None = None,
+                 quota_period: float = 30 * 24 * 3600,
+                 mode: str = "wait",
+                 max_wait: float = 10.0):
+        if mode not in ("wait", "fail"):
+            raise ValueError(f"Unknown rate limit mode: {mode}")
+        self.name = name
+        self.mode = mode
+        self.max_wait = max_wait
+        self.buckets: List[TokenBucket] = [TokenBucket(rate, burst or max(1.0, rate))]
+        if quota:
+            self.buckets.append(TokenBucket(quota / quota_period, quota))
+        # re-entrant so _leave() can run while acquire() holds the lock
+        self._cond = threading.Condition(threading.RLock())
+        self._queue: deque = deque()
+        self._tickets = itertools.count()
+        self._metrics = {"acquired": 0, "rejected": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def _poll(self, ticket: int) -> float | None:
+        """
+        Try to take a permit for `ticket` (caller holds the lock). Returns 0 on success, the seconds
+        until a token frees up if the ticket is at the head of the queue, or None if it must keep queuing.
+        """
+        if self._queue[0] != ticket:
+            return None
+        now = time.monotonic()
+        delay = max(b.delay(now) for b in self.buckets)
+        if delay > 0:
+            return delay
+        for b in self.buckets:
+            b.consume()
+        self._queue.popleft()
+        self._cond.notify_all()
+        return 0.0
+
+    def _enter(self, block: bool) -> int:
+        ticket = next(self._tickets)
+        with self._cond:
+            if not block and (self._queue or max(b.delay(time.monotonic()) for b in self.buckets) > 0):
+                self._metrics["rejected"] += 1
+                raise RateLimitExceeded(f"{self.name}: rate limit reached")
+            self._queue.append(ticket)
+        return ticket
+
+    def _leave(self, ticket: int, started: float, acquired: bool) -> float:
+        waited = time.monotonic() - started
+        with self._cond:
+            if acquired:
+                self._metrics["acquired"] += 1
+                self._metrics["total_wait"] += waited
+                self._metrics["max_wait"] = max(self._metrics["max_wait"], waited)
+            else:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                self._metrics["rejected"] += 1
+                self._cond.notify_all()
+        return waited
+
+    def acquire(self, block: bool | None = None, timeout: float | None = None) -> float:
+        """Take one permit; returns the seconds spent queuing. Raises RateLimitExceeded on failure."""
+        block = self.mode == "wait" if block is None else block
+        timeout = self.max_wait if timeout is None else timeout
+        started = time.monotonic()
+        ticket = self._enter(block)
+        deadline = started + timeout
+        acquired = False
+        try:
+            with self._cond:
+                while True:
+                    delay = self._poll(ticket)
+                    if delay == 0:
+                        acquired = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    # give up early when the next token cannot arrive before the deadline
+                    if remaining <= 0 or (delay is not None and delay > remaining):
+                        raise RateLimitExceeded(f"{self.name}: no permit within {timeout}s")
+                    self._cond.wait(min(delay, remaining) if delay is not None else remaining)
+        finally:
+            # timeouts and interrupts must not leave the ticket blocking the head of the queue
+            if not acquired:
+                self._leave(ticket, started, acquired=False)
+        return self._leave(ticket, started, acquired=True)
+
+    async def acquire_async(self, block: bool | None = None, timeout: float | None = None) -> float:
+        """asyncio variant of acquire(); waits without blocking the event loop."""
+        block = self.mode == "wait" if block is None else block
+        timeout = self.max_wait if timeout is None else timeout
+        started = time.monotonic()
+        ticket = self._enter(block)
+        deadline = started + timeout
+        acquired = False
+        try:
+            while True:
+                with self._cond:
+                    delay = self._poll(ticket)
+                if delay == 0:
+                    acquired = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (delay is not None and delay > remaining):
+                    raise RateLimitExceeded(f"{self.name}: no permit within {timeout}s")
+                await asyncio.sleep(min(delay if delay is not None else 0.01, remaining))
+        finally:
+            # a cancelled task (e.g. asyncio.wait_for timing out) must give up its place in the queue
+            if not acquired:
+                self._leave(ticket, started, acquired=False)
+        return self._leave(ticket, started, acquired=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            acquired = self._metrics["acquired"]
+            return {
+                "name": self.name,
+                "mode": self.mode,
+                "queued": len(self._queue),
+                **self._metrics,
+                "avg_wait": self._metrics["total_wait"] / acquired if acquired else 0.0
+            }
+
+_limiters: Dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+def _from_settings(name: str) -> RateLimiter:
+    prefix = name.upper()
+    return RateLimiter(
+        name,
+        rate=getattr(settings, f"{prefix}_RATE_LIMIT", 5.0),
+        quota=getattr(settings, f"{prefix}_MONTHLY_QUOTA", None),
+        mode=settings.RATE_LIMIT_MODE,
+        max_wait=settings.RATE_LIMIT_MAX_WAIT
+    )
+
+def get_limiter(name: str) -> RateLimiter:
+    """Shared limiter for an upstream ("amadeus", "serpapi", ...), configured from settings on first use."""
+    with _registry_lock:
+        if name not in _limiters:
+            _limiters[name] = _from_settings(name)
+        return _limiters[name]
+
+def configure_limiter(name: str, **kwargs) -> RateLimiter:
+    """Replace an upstream's limiter, e.g. configure_limiter("serpapi", rate=1, mode="fail")."""
+    limiter = RateLimiter(name, **kwargs)
+    with _registry_lock:
+        _limiters[name] = limiter
+    return limiter
+
+def limiter_stats() -> List[Dict[str, Any]]:
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return [l.stats() for l in limiters]
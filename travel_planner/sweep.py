@@ -0,0 +1,136 @@
+from typing import List, Dict, Any, Optional
+import numpy as np
+from travel_planner.utils import allocate_budget, allocate_budget_array, close_to_budget_array, item_price, restaurant_price
+from travel_planner.pareto import pareto_indices
+
+def _pareto_pools(role: str, items: List[Dict[str, Any]], pool: np.ndarray, cap: int) -> np.ndarray:
+    """
+    Per row, the candidates plan() would send to ranking: pareto_prune() applied to that row's pool
+    (candidates are columns in agent order). Rows sharing a pool share one pruning pass.
+    """
+    pruned = np.zeros_like(pool)
+    fronts: Dict[bytes, np.ndarray] = {}
+    for row in range(len(pool)):
+        key = pool[row].tobytes()
+        if key not in fronts:
+            idx = np.flatnonzero(pool[row])
+            fronts[key] = idx[pareto_indices(role, [items[i] for i in idx], cap)]
+        pruned[row, fronts[key]] = True
+    return pruned
+
+def _best_eligible(eligible: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """For every row, the highest-scored eligible candidate (first one on ties); -1 where none is eligible."""
+    masked = np.where(eligible, scores[None, :], -np.inf)
+    idx = np.argmax(masked, axis=1)
+    return np.where(eligible.any(axis=1), idx, -1)
+
+def _take(values: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    if values.size == 0:
+        return np.zeros(idx.shape)
+    return np.where(idx >= 0, values[np.clip(idx, 0, None)], 0.0)
+
+def sweep_selection(flights: List[Dict[str, Any]],
+                    hotels: List[Dict[str, Any]],
+                    restaurants: List[Dict[str, Any]],
+                    nights: int,
+                    budgets,
+                    allocations: Optional[List[Optional[Dict[str, float]]]] = None,
+                    tolerance: float = 0.05) -> Dict[str, List[Any]]:
+    """
+    Apply the orchestrator's selection and progressive-relaxation rules to every (budget, allocation)
+    pair in one vectorized pass over already fetched and scored candidates.
+
+    flights/hotels: every candidate with a "score", unfiltered by budget
+    restaurants: ranked restaurant candidates with a "score", best first (already Pareto-pruned like plan())
+    Returns a columnar table (column name -> list of values), one row per (allocation, budget).
+    """
+    budgets = np.asarray(budgets, dtype=float).ravel()
+    allocations = allocations or [None]
+
+    # Grid: rows are allocations x budgets
+    alloc_rows = [allocate_budget_array(budgets, a) for a in allocations]
+    B = np.tile(budgets, len(allocations))
+    F = np.concatenate([a["flight"] for a in alloc_rows])
+    H = np.concatenate([a["hotel"] for a in alloc_rows])
+    R = np.concatenate([a["restaurant"] for a in alloc_rows])
+    split_labels = []
+    for a in allocations:
+        pct = allocate_budget(100.0, a)
+        split_labels.extend(["/".join(f"{pct[k]:g}" for k in ("flight", "hotel", "restaurant"))] * len(budgets))
+    n = len(B)
+
+    # Flights: FlightAgent keeps affordable ones sorted by price (or all if none fit), plan() prunes them to
+    # at most 3 Pareto-optimal ones and the best-scored of those wins
+    flights = sorted(flights, key=lambda f: f.get("price", float("inf")))
+    fp = np.array([item_price(f, "price") for f in flights])
+    fs = np.array([float(f.get("score", 0) or 0) for f in flights])
+    if flights:
+        fits = fp[None, :] <= F[:, None]
+        pool = np.where(fits.any(axis=1)[:, None], fits, True)
+        flight_idx = _best_eligible(_pareto_pools("flight", flights, pool, 3), fs)
+    else:
+        flight_idx = np.full(n, -1)
+    flight_cost = _take(fp, flight_idx)
+
+    # Hotels: agoda_search keeps those under the per-night cap, ordered by rating then price; pruned like flights
+    hotels = sorted(hotels, key=lambda h: (-h.get("rating", 0), h.get("price_per_night", 0)))
+    hp = np.array([item_price(h, "price_per_night") for h in hotels])
+    hs = np.array([float(h.get("score", 0) or 0) for h in hotels])
+    max_ppn = np.round(H / max(nights, 1), 2)
+    if hotels:
+        hotel_idx = _best_eligible(_pareto_pools("hotel", hotels, hp[None, :] <= max_ppn[:, None], 3), hs)
+    else:
+        hotel_idx = np.full(n, -1)
+    hotel_cost = _take(hp, hotel_idx) * nights
+
+    # Restaurants: greedy in ranked order until the restaurant allocation is exhausted
+    rp = np.array([restaurant_price(r) for r in restaurants])
+    chosen = np.zeros((n, len(restaurants)), dtype=bool)
+    remaining = R.copy()
+    for j, price in enumerate(rp):
+        take = (price == 0) | (price <= remaining)
+        chosen[:, j] = take
+        remaining = np.round(remaining - price * take, 2)
+    rest_cost = chosen @ rp if len(rp) else np.zeros(n)
+    subtotal = np.round(flight_cost + hotel_cost + rest_cost, 2)
+
+    # Progressive relaxation 1) drop the most expensive restaurants while over budget
+    for j in np.argsort(-rp, kind="stable"):
+        drop = (subtotal > B) & chosen[:, j]
+        chosen[:, j] &= ~drop
+        rest_cost = rest_cost - rp[j] * drop
+        subtotal = np.round(flight_cost + hotel_cost + rest_cost, 2)
+
+    # 2) cheaper hotel: first result under 80% of the per-night cap
+    if hotels:
+        alt_pool = hp[None, :] <= np.round(max_ppn * 0.8, 2)[:, None]
+        alt_idx = np.where(alt_pool.any(axis=1), np.argmax(alt_pool, axis=1), -1)
+        alt_cost = _take(hp, alt_idx) * nights
+        swap = (subtotal > B) & (alt_idx >= 0) & (alt_cost < hotel_cost)
+        hotel_idx = np.where(swap, alt_idx, hotel_idx)
+        hotel_cost = np.where(swap, alt_cost, hotel_cost)
+        subtotal = np.round(flight_cost + hotel_cost + rest_cost, 2)
+
+    # 3) cheaper flight: the cheapest result at 90% of the flight allocation is the cheapest flight overall
+    if flights:
+        swap = (subtotal > B) & (fp[0] < flight_cost)
+        flight_idx = np.where(swap, 0, flight_idx)
+        flight_cost = np.where(swap, fp[0], flight_cost)
+        subtotal = np.round(flight_cost + hotel_cost + rest_cost, 2)
+
+    within = close_to_budget_array(subtotal, B, tolerance)
+    return {
+        "budget": B.tolist(),
+        "split": split_labels,
+        "flight_alloc": F.tolist(),
+        "hotel_alloc": H.tolist(),
+        "restaurant_alloc": R.tolist(),
+        "flight": [flights[i].get("airline") if i >= 0 else None for i in flight_idx],
+        "hotel": [hotels[i].get("name") if i >= 0 else None for i in hotel_idx],
+        "restaurants": chosen.sum(axis=1).tolist(),
+        "flight_cost": np.round(flight_cost, 2).tolist(),
+        "hotel_cost": np.round(hotel_cost, 2).tolist(),
+        "restaurant_cost": np.round(rest_cost, 2).tolist(),
+        "subtotal": subtotal.tolist(),
+        "within_tolerance": within.tolist()
+    }
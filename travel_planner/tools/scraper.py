@@ -1,5 +1,9 @@
+import copy
 from typing import List, Dict, Any
 from travel_planner.config import settings
+from travel_planner.cache import cached
+from travel_planner.ratelimit import get_limiter, RateLimitExceeded
+from travel_planner.tools import snapshot
 import requests
 from bs4 import BeautifulSoup
 import requests
@@ -28,6 +32,7 @@ def _init_amadeus_client():
     except Exception:
         return None
 
+@cached("iata", ttl=7 * 24 * 3600, ignore=("amadeus_client",), cache_if=lambda code: code is not None)
 def _resolve_to_iata(amadeus_client, query: str) -> str | None:
     if not query:
         return None
@@ -51,29 +56,44 @@ def _resolve_to_iata(amadeus_client, query: str) -> str | None:
     if city_lower in city_mappings:
         return city_mappings[city_lower]
     
-    if not amadeus_client:
+    if not amadeus_client and not snapshot.replaying():
         return None
+
+    def locations(**params):
+        def fetch():
+            get_limiter("amadeus").acquire()
+            resp = amadeus_client.reference_data.locations.get(**params)
+            return getattr(resp, "data", None) or []
+        return snapshot.upstream("amadeus.locations", params, fetch)
+
     try:
-        resp = amadeus_client.reference_data.locations.get(keyword=q, subType='CITY')
-        data = getattr(resp, "data", None) or []
+        data = locations(keyword=q, subType='CITY')
         if not data:
-            resp = amadeus_client.reference_data.locations.get(keyword=q)
-            data = getattr(resp, "data", None) or []
+            data = locations(keyword=q)
         for item in data:
             if item.get("iataCode"):
                 return item.get("iataCode")
+    except RateLimitExceeded:
+        raise
     except Exception:
         return None
     return None
 
+def _is_live_flights(flights: List[Dict[str, Any]]) -> bool:
+    # error fallbacks are tagged "MockAir-<reason>" and must not be cached
+    return not any(str(f.get("airline", "")).startswith("MockAir-") for f in flights)
+
+@cached("flights", cache_if=_is_live_flights)
 def amadeus_flights_search(origin: str, destination: str, depart_date: str, return_date: str | None = None, passengers: int = 1) -> List[Dict[str, Any]]:
     """
     Uses Amadeus Flight Offers API to obtain flight options (keeps function name for compatibility).
     Returns a list of normalized flight dicts.
     If Amadeus not configured, returns mock results.
+    Raises RateLimitExceeded when the shared Amadeus limiter refuses the call (fail-fast mode or timeout).
     """
+    replay = snapshot.replaying()
     # If no Amadeus credentials, return mock data
-    if not AMADEUS_ID or not AMADEUS_SECRET or AmadeusClient is None:
+    if not replay and (not AMADEUS_ID or not AMADEUS_SECRET or AmadeusClient is None):
         return [
             {"airline": "MockAir", "departure": f"{depart_date}T09:00", "arrival": f"{depart_date}T11:00",
              "price": 280.0, "currency": "USD", "stops": 0, "link": None},
@@ -81,8 +101,8 @@ def amadeus_flights_search(origin: str, destination: str, depart_date: str, retu
              "price": 200.0, "currency": "USD", "stops": 1, "link": None}
         ]
 
-    client = _init_amadeus_client()
-    if not client:
+    client = None if replay else _init_amadeus_client()
+    if not client and not replay:
         # fallback mock
         return [{"airline": "MockAir-Fallback", "departure": f"{depart_date}T09:00","arrival": f"{depart_date}T11:00","price": 300.0,"currency":"USD","stops":0,"link":None}]
 
@@ -100,8 +120,15 @@ def amadeus_flights_search(origin: str, destination: str, depart_date: str, retu
     if return_date:
         params["returnDate"] = return_date
 
-    try:
+    def fetch_offers():
+        get_limiter("amadeus").acquire()
         resp = client.shopping.flight_offers_search.get(**params)
+        return getattr(resp, "data", []) or []
+
+    try:
+        offers = snapshot.upstream("amadeus.flight_offers", params, fetch_offers)
+    except RateLimitExceeded:
+        raise
     except AmadeusResponseError as err:
         import sys
         print(f"Amadeus API Error: {err}", file=sys.stderr)
@@ -115,7 +142,6 @@ def amadeus_flights_search(origin: str, destination: str, depart_date: str, retu
         print(f"Amadeus Exception: {str(e)}", file=sys.stderr)
         return [{"airline": "MockAir-Exception", "departure": f"{depart_date}T09:00","arrival": f"{depart_date}T11:00","price":330.0,"currency":"USD","stops":0,"link":None}]
 
-    offers = getattr(resp, "data", []) or []
     flights = []
     for offer in offers:
         try:
@@ -155,21 +181,33 @@ def amadeus_flights_search(origin: str, destination: str, depart_date: str, retu
     return sorted(flights, key=lambda f: f.get("price", float("inf")))
 
 # -------- Agoda (hotels) - mocked placeholder -------
-def agoda_search(destination: str, check_in: str, check_out: str, max_price_per_night: float | None=None, stars_preference:int | None=None, verbose: bool = False) -> List[Dict[str,Any]]:
-    if verbose:
-        print(f"[AGODA_SEARCH] Destination: {destination}, Check-in: {check_in}, Check-out: {check_out}")
-        print(f"[AGODA_SEARCH] Max price/night: ${max_price_per_night}, Stars: {stars_preference}")
-    
-    hotels = [
-        {"name": "Agoda Plaza", "stars": 4, "price_per_night": 150.0, "rating": 8.9, "currency": "USD", "link": "https://www.agoda.com/mock1"},
-        {"name": "Budget Stay", "stars": 3, "price_per_night": 90.0, "rating": 7.8, "currency": "USD", "link": "https://www.agoda.com/mock2"},
-        {"name": "Luxury Resort", "stars": 5, "price_per_night": 300.0, "rating": 9.4, "currency": "USD", "link": "https://www.agoda.com/mock3"}
-    ]
+MOCK_HOTELS = [
+    {"name": "Agoda Plaza", "stars": 4, "price_per_night": 150.0, "rating": 8.9, "currency": "USD", "link": "https://www.agoda.com/mock1"},
+    {"name": "Budget Stay", "stars": 3, "price_per_night": 90.0, "rating": 7.8, "currency": "USD", "link": "https://www.agoda.com/mock2"},
+    {"name": "Luxury Resort", "stars": 5, "price_per_night": 300.0, "rating": 9.4, "currency": "USD", "link": "https://www.agoda.com/mock3"}
+]
+
+def _is_live_hotels(hotels: List[Dict[str, Any]]) -> bool:
+    # the mock fallback (no key, upstream error, empty response) must never be cached
+    return hotels != MOCK_HOTELS
+
+@cached("hotels", cache_if=_is_live_hotels)
+def fetch_hotels(destination: str, check_in: str, check_out: str, verbose: bool = False) -> List[Dict[str,Any]]:
+    """
+    Fetch the unfiltered hotel list for a destination and stay (SerpAPI Google Hotels, else mock data).
+    Cached independently of price/stars filters so budget changes reuse the same upstream response.
+    Raises RateLimitExceeded when the shared SerpAPI limiter refuses the call.
+    """
+    # fresh copy per call so callers can never mutate the shared mock data
+    hotels = copy.deepcopy(MOCK_HOTELS)
     
     # Try SerpAPI if configured
-    if settings.SERPAPI_API_KEY:
+    if settings.SERPAPI_API_KEY or snapshot.replaying():
         if verbose:
-            print(f"[AGODA_SEARCH] SerpAPI key found (length: {len(settings.SERPAPI_API_KEY)}), attempting API call...")
+            if settings.SERPAPI_API_KEY:
+                print(f"[AGODA_SEARCH] SerpAPI key found (length: {len(settings.SERPAPI_API_KEY)}), attempting API call...")
+            else:
+                print(f"[AGODA_SEARCH] Replaying SerpAPI response from snapshot")
         try:
             params = {
                 "engine": "google_hotels",
@@ -181,13 +219,19 @@ def agoda_search(destination: str, check_in: str, check_out: str, max_price_per_
                 "api_key": settings.SERPAPI_API_KEY
             }
             
-            response = requests.get("https://serpapi.com/search", params=params, timeout=10)
-            
-            if verbose:
-                print(f"[AGODA_SEARCH] API response status: {response.status_code}")
+            def fetch():
+                waited = get_limiter("serpapi").acquire()
+                if verbose and waited > 0.01:
+                    print(f"[AGODA_SEARCH] Waited {waited:.2f}s for SerpAPI rate limit")
+                response = requests.get("https://serpapi.com/search", params=params, timeout=10)
+                
+                if verbose:
+                    print(f"[AGODA_SEARCH] API response status: {response.status_code}")
+                
+                response.raise_for_status()
+                return response.json()
             
-            response.raise_for_status()
-            data = response.json()
+            data = snapshot.upstream("serpapi.google_hotels", params, fetch)
             
             if verbose:
                 print(f"[AGODA_SEARCH] API returned {len(data.get('properties', []))} properties")
@@ -238,6 +282,8 @@ def agoda_search(destination: str, check_in: str, check_out: str, max_price_per_
                 if verbose:
                     print(f"[AGODA_SEARCH] No hotels from API, using mock data")
         
+        except RateLimitExceeded:
+            raise
         except requests.exceptions.RequestException as e:
             if verbose:
                 print(f"[AGODA_SEARCH] API request error: {str(e)}")
@@ -256,6 +302,15 @@ def agoda_search(destination: str, check_in: str, check_out: str, max_price_per_
         if verbose:
             print(f"[AGODA_SEARCH] No SerpAPI key configured, using mock data")
     
+    return hotels
+
+def agoda_search(destination: str, check_in: str, check_out: str, max_price_per_night: float | None=None, stars_preference:int | None=None, verbose: bool = False) -> List[Dict[str,Any]]:
+    if verbose:
+        print(f"[AGODA_SEARCH] Destination: {destination}, Check-in: {check_in}, Check-out: {check_out}")
+        print(f"[AGODA_SEARCH] Max price/night: ${max_price_per_night}, Stars: {stars_preference}")
+    
+    hotels = fetch_hotels(destination, check_in, check_out, verbose=verbose)
+    
     if verbose:
         print(f"[AGODA_SEARCH] Total hotels before filtering: {len(hotels)}")
 
@@ -0,0 +1,192 @@
+"""
+Record/replay of upstream responses (Amadeus, SerpAPI, OpenAI).
+
+mode "record": every upstream call is performed normally and its JSON payload is stored in a snapshot
+file, keyed by the normalized request. mode "replay": upstream calls are served from the snapshot
+(memory-mapped, with an in-file index) and never hit the network; optional simulated latency.
+
+Snapshot layout:
+    MAGIC | zlib(json payload) ... | zlib(json index {key: [offset, length]}) | FOOTER(index offset, index length, FOOTER_MAGIC)
+"""
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+from travel_planner.config import settings
+
+MAGIC = b"TPSNAP1\n"
+FOOTER = struct.Struct("<QQ8s")
+FOOTER_MAGIC = b"TPSNAPIX"
+SECRET_PARAMS = {"api_key", "client_secret", "apikey"}
+
+class SnapshotMiss(KeyError):
+    """Raised in replay mode when the snapshot has no response for a request."""
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None and k not in SECRET_PARAMS}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+def request_key(service: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps(_normalize(params), sort_keys=True, default=str, separators=(",", ":"))
+    return f"{service}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+def _read_index(buf) -> Dict[str, list]:
+    if len(buf) < len(MAGIC) + FOOTER.size or buf[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a snapshot file")
+    offset, length, magic = FOOTER.unpack(buf[len(buf) - FOOTER.size:])
+    if magic != FOOTER_MAGIC:
+        raise ValueError("snapshot index missing (file not closed cleanly?)")
+    return json.loads(zlib.decompress(buf[offset:offset + length]))
+
+class SnapshotWriter:
+    """Appends compressed responses to a snapshot file; the index is written on close()."""
+    def __init__(self, path: str):
+        self.path = path
+        self._index: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        existing = b""
+        if os.path.exists(path):
+            # keep previously recorded responses
+            with open(path, "rb") as f:
+                existing = f.read()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path + ".tmp", "wb")
+        self._file.write(MAGIC)
+        if existing:
+            try:
+                for key, (offset, length) in _read_index(existing).items():
+                    self._append_raw(key, existing[offset:offset + length])
+            except ValueError:
+                pass
+
+    def _append_raw(self, key: str, blob: bytes):
+        self._index[key] = [self._file.tell(), len(blob)]
+        self._file.write(blob)
+
+    def append(self, key: str, payload: Any):
+        blob = zlib.compress(json.dumps(payload, default=str).encode("utf-8"))
+        with self._lock:
+            if not self._file.closed:
+                self._append_raw(key, blob)
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            index = zlib.compress(json.dumps(self._index).encode("utf-8"))
+            offset = self._file.tell()
+            self._file.write(index)
+            self._file.write(FOOTER.pack(offset, len(index), FOOTER_MAGIC))
+            self._file.close()
+            os.replace(self.path + ".tmp", self.path)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+class SnapshotReader:
+    """Serves responses from a memory-mapped snapshot file."""
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = _read_index(self._mmap)
+
+    def get(self, key: str) -> Any:
+        entry = self._index.get(key)
+        if entry is None:
+            raise SnapshotMiss(key)
+        offset, length = entry
+        return json.loads(zlib.decompress(self._mmap[offset:offset + length]))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+_state: Dict[str, Any] = {"mode": None, "writer": None, "reader": None, "latency": 0.0}
+_state_lock = threading.RLock()
+_counters = {"recorded": 0, "replayed": 0, "misses": 0}
+
+def configure(mode: str = "off", path: Optional[str] = None, latency_ms: float = 0.0):
+    """Switch snapshot mode ("off", "record" or "replay"); closes any open snapshot first."""
+    if mode not in ("off", "record", "replay"):
+        raise ValueError(f"Unknown snapshot mode: {mode}")
+    path = path or settings.SNAPSHOT_PATH
+    with _state_lock:
+        close()
+        _state["latency"] = latency_ms / 1000.0
+        if mode == "record":
+            _state["writer"] = SnapshotWriter(path)
+        elif mode == "replay":
+            _state["reader"] = SnapshotReader(path)
+        _state["mode"] = mode
+
+def close():
+    """Flush the snapshot being recorded (writes its index) and release any replay snapshot."""
+    with _state_lock:
+        writer, reader = _state["writer"], _state["reader"]
+        _state["writer"] = _state["reader"] = None
+        _state["mode"] = "off"
+    if writer is not None:
+        writer.close()
+    if reader is not None:
+        reader.close()
+
+atexit.register(close)
+
+def mode() -> str:
+    if _state["mode"] is None:
+        with _state_lock:
+            if _state["mode"] is None:
+                configure(settings.SNAPSHOT_MODE, settings.SNAPSHOT_PATH, settings.SNAPSHOT_LATENCY_MS)
+    return _state["mode"]
+
+def replaying() -> bool:
+    return mode() == "replay"
+
+def stats() -> Dict[str, Any]:
+    reader, writer = _state["reader"], _state["writer"]
+    entries = len(reader) if reader is not None else (len(writer) if writer is not None else 0)
+    return {"mode": mode(), "entries": entries, **_counters}
+
+def upstream(service: str, params: Dict[str, Any], fetch: Callable[[], Any]) -> Any:
+    """
+    Perform (or replay) one upstream call. `fetch` must return a JSON-serializable payload.
+    Secrets in `params` (api_key, ...) are never part of the key.
+    """
+    current = mode()
+    if current == "off":
+        return fetch()
+    key = request_key(service, params)
+    if current == "replay":
+        if _state["latency"]:
+            time.sleep(_state["latency"])
+        try:
+            payload = _state["reader"].get(key)
+        except SnapshotMiss:
+            _counters["misses"] += 1
+            raise
+        _counters["replayed"] += 1
+        return payload
+    payload = fetch()
+    writer = _state["writer"]
+    if writer is not None:
+        writer.append(key, payload)
+        _counters["recorded"] += 1
+    return payload
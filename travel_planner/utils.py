@@ -1,5 +1,21 @@
 from datetime import datetime
-from typing import Dict
+from typing import Any, Dict
+import numpy as np
+
+# Price fields per role, in order of preference (restaurants carry estimated_price, avg_price or price)
+RESTAURANT_PRICE_FIELDS = ("estimated_price", "avg_price", "price")
+PRICE_FIELDS = {"flight": ("price",), "hotel": ("price_per_night",), "restaurant": RESTAURANT_PRICE_FIELDS}
+
+def item_price(item: Dict[str, Any], *fields: str) -> float:
+    """First non-zero value among `fields` (0 when none is set)."""
+    for f in fields:
+        value = item.get(f)
+        if value:
+            return float(value)
+    return 0.0
+
+def restaurant_price(restaurant: Dict[str, Any]) -> float:
+    return item_price(restaurant, *RESTAURANT_PRICE_FIELDS)
 
 def nights_between(start_date: str, end_date: str) -> int:
     s = datetime.fromisoformat(start_date)
@@ -7,7 +23,7 @@ def nights_between(start_date: str, end_date: str) -> int:
     days = max((e - s).days, 0)
     return days
 
-def allocate_budget(total_budget: float, custom_allocation: Dict[str, float] | None = None) -> Dict[str, float]:
+def _allocation_pct(custom_allocation: Dict[str, float] | None = None) -> Dict[str, float]:
     default_pct = {"flight": 0.30, "hotel": 0.40, "restaurant": 0.30}
     if custom_allocation:
         total_pct = sum(custom_allocation.values())
@@ -20,6 +36,10 @@ def allocate_budget(total_budget: float, custom_allocation: Dict[str, float] | N
                 alloc_pct[k] = custom_allocation.get(k, default_pct[k]) / total_pct
     else:
         alloc_pct = default_pct
+    return alloc_pct
+
+def allocate_budget(total_budget: float, custom_allocation: Dict[str, float] | None = None) -> Dict[str, float]:
+    alloc_pct = _allocation_pct(custom_allocation)
     allocation = {k: round(total_budget * v, 2) for k, v in alloc_pct.items()}
     # round mismatch
     diff = round(total_budget - sum(allocation.values()), 2)
@@ -31,3 +51,21 @@ def close_to_budget(candidate_total: float, target_budget: float, tolerance: flo
     lower = target_budget * (1 - tolerance)
     upper = target_budget * (1 + tolerance)
     return lower <= candidate_total <= upper
+
+def allocate_budget_array(total_budgets, custom_allocation: Dict[str, float] | None = None) -> Dict[str, np.ndarray]:
+    """
+    Vectorized allocate_budget(): splits an array of budgets with one allocation, same rounding rules.
+    """
+    budgets = np.asarray(total_budgets, dtype=float)
+    pct = _allocation_pct(custom_allocation)
+    allocation = {k: np.round(budgets * v, 2) for k, v in pct.items()}
+    # round mismatch
+    diff = np.round(budgets - (allocation["flight"] + allocation["hotel"] + allocation["restaurant"]), 2)
+    allocation["restaurant"] = np.round(allocation["restaurant"] + diff, 2)
+    return allocation
+
+def close_to_budget_array(candidate_totals, target_budgets, tolerance: float = 0.05) -> np.ndarray:
+    """Vectorized close_to_budget()."""
+    totals = np.asarray(candidate_totals, dtype=float)
+    targets = np.asarray(target_budgets, dtype=float)
+    return (targets * (1 - tolerance) <= totals) & (totals <= targets * (1 + tolerance))